@@ -1,97 +1,370 @@
 import dash
 import dash_html_components as html
 import dash_bootstrap_components as dbc
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
 import dash_core_components as dcc
 
+from callbacks.balance_scatter import update_balance_scatter
 from callbacks.income_expenses import update_tab_content, modify_income_table, modify_expenses_table, update_pie_chart, \
-    modify_bills_table
+    modify_bills_table, add_suggested_bills, budget_version
+from callbacks.offset_interest import update_reconciliation, update_interest_what_if
+from callbacks.refresh import background_manager, refresh_data
+from callbacks.scenarios import update_scenarios
+from callbacks.statistics import check_dataset_version, populate_statistics, page_total_view, page_monthly_view, \
+    loading_poll_ms
+from callbacks.transaction_search import search_transactions
+from etl.dataset import warm_dataset, use_shared_dataset, watch_dataset
+from layouts.mortgage_graphs import mortgage_graph
+from layouts.offset_interest import interest_controls, reconciliation_status, reconciliation_table, what_if_status, \
+    what_if_table
+from layouts.refresh import refresh_controls
+from layouts.scenarios import scenario_controls, scenario_status, scenario_chart, best_scenarios_table
 from layouts.statistics_tables import monthly_view_table, total_view_table, interest_bar_chart, net_loan_savings, \
-    loan_bar_chart
-
-app = dash.Dash(__name__,
-                external_stylesheets=[dbc.themes.CYBORG, 'assets/styles.css'],
-                suppress_callback_exceptions=True)
-
-app.callback(
-    Output("income-table", "data"),
-    Input("add-income-row-button", "n_clicks"),
-    Input("income-table", "data"),
-    Input("save-income-button", "n_clicks"),
-    prevent_initial_call=True
-)(modify_income_table)
-
-app.callback(
-    Output("expenses-table", "data"),
-    Input("add-expense-row-button", "n_clicks"),
-    Input("expenses-table", "data"),
-    Input("save-expenses-button", "n_clicks"),
-    prevent_initial_call=True
-)(modify_expenses_table)
-
-app.callback(
-    Output("bills-table", "data"),
-    Input("add-bill-row-button", "n_clicks"),
-    Input("bills-table", "data"),
-    Input("save-bills-button", "n_clicks"),
-    prevent_initial_call=True
-)(modify_bills_table)
-
-app.callback(
-    Output("tabs-content", "children"),
-    [Input("tabs", "active_tab")]
-)(update_tab_content)
-
-app.callback(
-    Output("pie-chart", "figure"),
-    [Input("tabs", "active_tab")]
-)(update_pie_chart)
-
-app.layout = dbc.Container([
-    dbc.Row([
-        dbc.Col([
-            html.H3("Last Month Summary"),
-            dbc.Tabs([
-                dbc.Tab(label="Summary", tab_id="summary-tab"),
-                dbc.Tab(label="Income", tab_id="income-tab"),
-                dbc.Tab(label="Bills", tab_id="bills-tab"),
-                dbc.Tab(label="Expenses", tab_id="expenses-tab"),
-            ], id="tabs", active_tab="summary-tab"),
-            html.Div(id="tabs-content")], width=7),
-        dbc.Col([
-            dcc.Graph(id='pie-chart')
-        ]),
-    ], style={'margin-bottom': '50px', 'margin-top': '50px'}),
-    dbc.Row([
-        dbc.Col([
-            html.H3("Total View"),
-            total_view_table
-        ]),
-        dbc.Col([
-            html.H3("Monthly View"),
-            monthly_view_table
+    loan_bar_chart, statistics_range_controls
+from layouts.transaction_search import search_controls, search_status, search_table
+from metrics import instrumented_callback, instrument_server
+from responses import serve_cached_responses, cached_figure_callback
+
+
+def create_app(shared_dataset=False):
+    if shared_dataset:
+        use_shared_dataset()
+
+    app = dash.Dash(__name__,
+                    external_stylesheets=[dbc.themes.CYBORG, 'assets/styles.css'],
+                    suppress_callback_exceptions=True)
+    # Callback latency, response sizes and ETL stage timings are served at /metrics
+    instrument_server(app)
+    # Figure responses are cached per data version and served compressed
+    serve_cached_responses(app)
+    callback = instrumented_callback(app)
+    figure_callback = cached_figure_callback(callback)
+
+    callback(
+        Output("income-table", "data"),
+        Output("income-table", "page_count"),
+        Output("income-delta", "data", allow_duplicate=True),
+        Input("add-income-row-button", "n_clicks"),
+        Input("income-table", "data_timestamp"),
+        Input("save-income-button", "n_clicks"),
+        Input("income-table", "page_current"),
+        Input("income-table", "page_size"),
+        Input("income-table", "sort_by"),
+        Input("income-table", "filter_query"),
+        State("income-table", "data"),
+        State("income-table", "data_previous"),
+        State("income-delta", "data"),
+        prevent_initial_call=True
+    )(modify_income_table)
+
+    callback(
+        Output("expenses-table", "data"),
+        Output("expenses-table", "page_count"),
+        Output("expenses-delta", "data", allow_duplicate=True),
+        Input("add-expense-row-button", "n_clicks"),
+        Input("expenses-table", "data_timestamp"),
+        Input("save-expenses-button", "n_clicks"),
+        Input("expenses-table", "page_current"),
+        Input("expenses-table", "page_size"),
+        Input("expenses-table", "sort_by"),
+        Input("expenses-table", "filter_query"),
+        State("expenses-table", "data"),
+        State("expenses-table", "data_previous"),
+        State("expenses-delta", "data"),
+        prevent_initial_call=True
+    )(modify_expenses_table)
+
+    callback(
+        Output("bills-table", "data"),
+        Output("bills-table", "page_count"),
+        Output("bills-delta", "data", allow_duplicate=True),
+        Input("add-bill-row-button", "n_clicks"),
+        Input("bills-table", "data_timestamp"),
+        Input("save-bills-button", "n_clicks"),
+        Input("bills-table", "page_current"),
+        Input("bills-table", "page_size"),
+        Input("bills-table", "sort_by"),
+        Input("bills-table", "filter_query"),
+        State("bills-table", "data"),
+        State("bills-table", "data_previous"),
+        State("bills-delta", "data"),
+        prevent_initial_call=True
+    )(modify_bills_table)
+
+    callback(
+        Output("bills-table", "data", allow_duplicate=True),
+        Output("bills-delta", "data", allow_duplicate=True),
+        Output("bill-suggestions", "data"),
+        Output("bill-suggestions", "selected_rows"),
+        Input("add-suggested-bills-button", "n_clicks"),
+        State("bill-suggestions", "selected_rows"),
+        State("bill-suggestions", "data"),
+        State("bills-table", "data"),
+        State("bills-delta", "data"),
+        prevent_initial_call=True
+    )(add_suggested_bills)
+
+    callback(
+        Output("tabs-content", "children"),
+        Output("income-delta", "data"),
+        Output("bills-delta", "data"),
+        Output("expenses-delta", "data"),
+        [Input("tabs", "active_tab")]
+    )(update_tab_content)
+
+    figure_callback(
+        Output("pie-chart", "figure"),
+        [Input("tabs", "active_tab"),
+         Input("income-delta", "data"),
+         Input("bills-delta", "data"),
+         Input("expenses-delta", "data")],
+        version=budget_version
+    )(update_pie_chart)
+
+    callback(
+        Output("monthly-version", "data"),
+        Output("total-version", "data"),
+        Output("offset-version", "data"),
+        Output("mortgage-version", "data"),
+        Output("dataset-poll", "interval"),
+        Input("dataset-poll", "n_intervals"),
+        Input("refreshed-version", "data"),
+        State("monthly-version", "data"),
+        State("total-version", "data"),
+        State("offset-version", "data"),
+        State("mortgage-version", "data"),
+        State("dataset-poll", "interval")
+    )(check_dataset_version)
+
+    # The ETL runs in a background process, so a refresh does not hold up a server worker
+    callback(
+        Output("refreshed-version", "data"),
+        Output("refresh-status", "children"),
+        Input("refresh-button", "n_clicks"),
+        background=True,
+        manager=background_manager(),
+        progress=Output("refresh-progress", "children"),
+        progress_default="",
+        running=[
+            (Output("cancel-refresh-button", "disabled"), False, True),
+            (Output("refresh-status", "children"), "", dash.no_update),
+        ],
+        cancel=[Input("cancel-refresh-button", "n_clicks")],
+        prevent_initial_call=True
+    )(refresh_data)
+
+    figure_callback(
+        Output("interest-bar-chart", "figure"),
+        Output("loan-bar-chart", "figure"),
+        Output("net-loan-savings", "figure"),
+        Input("monthly-version", "data"),
+        # Custom ranges come from the statistics index, which changes with the transactions even when the
+        # monthly view does not
+        Input("offset-version", "data"),
+        Input("mortgage-version", "data"),
+        Input("statistics-dates", "start_date"),
+        Input("statistics-dates", "end_date"),
+        Input("statistics-granularity", "value"),
+        prevent_initial_call=True
+    )(populate_statistics)
+
+    callback(
+        Output("total-view-table", "data"),
+        Output("total-view-table", "page_count"),
+        Input("total-view-table", "page_current"),
+        Input("total-view-table", "page_size"),
+        Input("total-view-table", "sort_by"),
+        Input("total-version", "data"),
+        Input("offset-version", "data"),
+        Input("mortgage-version", "data"),
+        Input("statistics-dates", "start_date"),
+        Input("statistics-dates", "end_date"),
+        prevent_initial_call=True
+    )(page_total_view)
+
+    callback(
+        Output("monthly-view-table", "data"),
+        Output("monthly-view-table", "page_count"),
+        Input("monthly-view-table", "page_current"),
+        Input("monthly-view-table", "page_size"),
+        Input("monthly-view-table", "sort_by"),
+        Input("monthly-view-table", "filter_query"),
+        Input("monthly-version", "data"),
+        prevent_initial_call=True
+    )(page_monthly_view)
+
+    callback(
+        Output("scatter-plot", "figure"),
+        Input("scatter-plot", "relayoutData"),
+        Input("offset-version", "data"),
+        prevent_initial_call=True
+    )(update_balance_scatter)
+
+    callback(
+        Output("scenario-chart", "figure"),
+        Output("best-scenarios-table", "data"),
+        Output("scenario-status", "children"),
+        Input("scenario-rate-changes", "value"),
+        Input("scenario-extra-repayments", "value"),
+        Input("scenario-offset-growth", "value"),
+        Input("scenario-lump-sums", "value"),
+        Input("monthly-version", "data"),
+        prevent_initial_call=True
+    )(update_scenarios)
+
+    callback(
+        Output("reconciliation-table", "data"),
+        Output("reconciliation-status", "children"),
+        Input("monthly-version", "data"),
+        # The daily balances and interest periods change with the transactions even when the monthly view does not
+        Input("offset-version", "data"),
+        Input("mortgage-version", "data"),
+        prevent_initial_call=True
+    )(update_reconciliation)
+
+    callback(
+        Output("interest-what-if-table", "data"),
+        Output("interest-what-if-status", "children"),
+        Input("interest-rate-changes", "value"),
+        Input("interest-offset-changes", "value"),
+        Input("monthly-version", "data"),
+        Input("offset-version", "data"),
+        Input("mortgage-version", "data"),
+        prevent_initial_call=True
+    )(update_interest_what_if)
+
+    callback(
+        Output("search-table", "data"),
+        Output("search-table", "page_count"),
+        Output("search-table", "page_current"),
+        Output("search-status", "children"),
+        Input("search-query", "value"),
+        Input("search-dates", "start_date"),
+        Input("search-dates", "end_date"),
+        Input("search-min-amount", "value"),
+        Input("search-max-amount", "value"),
+        Input("search-table", "page_current"),
+        Input("search-table", "page_size"),
+        Input("offset-version", "data"),
+        Input("mortgage-version", "data"),
+        Input("monthly-version", "data"),
+        prevent_initial_call=True
+    )(search_transactions)
+
+    app.layout = dbc.Container([
+        refresh_controls,
+        dbc.Row([
+            dbc.Col([
+                html.H3("Last Month Summary"),
+                dbc.Tabs([
+                    dbc.Tab(label="Summary", tab_id="summary-tab"),
+                    dbc.Tab(label="Income", tab_id="income-tab"),
+                    dbc.Tab(label="Bills", tab_id="bills-tab"),
+                    dbc.Tab(label="Expenses", tab_id="expenses-tab"),
+                ], id="tabs", active_tab="summary-tab"),
+                html.Div(id="tabs-content")], width=7),
+            dbc.Col([
+                dcc.Graph(id='pie-chart')
+            ]),
+        ], style={'margin-bottom': '50px', 'margin-top': '50px'}),
+        statistics_range_controls,
+        dbc.Row([
+            dbc.Col([
+                html.H3("Total View"),
+                total_view_table
+            ]),
+            dbc.Col([
+                html.H3("Monthly View"),
+                monthly_view_table
+            ]),
+        ], style={'margin-bottom': '20px'}),
+        dbc.Row([
+            dbc.Col([
+                html.H3("Interest & Loan Charts"),
+                dbc.Tabs([
+                    dbc.Tab(label="Interest Chart", children=[
+                        html.Br(),
+                        interest_bar_chart
+                    ]),
+                    dbc.Tab(label="Loan Chart", children=[
+                        html.Br(),
+                        loan_bar_chart
+                    ]),
+                ])
+            ], width=6),
+            dbc.Col([
+                html.H3("Net Loan Savings"),
+                net_loan_savings
+            ], width=6),
         ]),
-    ], style={'margin-bottom': '20px'}),
-    dbc.Row([
-        dbc.Col([
-            html.H3("Interest & Loan Charts"),
-            dbc.Tabs([
-                dbc.Tab(label="Interest Chart", children=[
-                    html.Br(),
-                    interest_bar_chart
-                ]),
-                dbc.Tab(label="Loan Chart", children=[
-                    html.Br(),
-                    loan_bar_chart
-                ]),
-            ])
-        ], width=6),
-        dbc.Col([
-            html.H3("Net Loan Savings"),
-            net_loan_savings
-        ], width=6),
-    ]),
-])
+        dbc.Row([
+            dbc.Col(html.H3("Offset Balance"), width=12),
+            mortgage_graph
+        ], style={'margin-top': '20px'}),
+        dbc.Row([
+            dbc.Col([
+                html.H3("Payoff Scenarios"),
+                scenario_controls,
+                scenario_status,
+                dbc.Tabs([
+                    dbc.Tab(label="Scenario Comparison", children=[
+                        html.Br(),
+                        scenario_chart
+                    ]),
+                    dbc.Tab(label="Best Scenarios", children=[
+                        html.Br(),
+                        best_scenarios_table
+                    ]),
+                ])
+            ]),
+        ], style={'margin-top': '20px'}),
+        dbc.Row([
+            dbc.Col([
+                html.H3("Interest Saved"),
+                dbc.Tabs([
+                    dbc.Tab(label="Reconciliation", children=[
+                        html.Br(),
+                        reconciliation_status,
+                        reconciliation_table
+                    ]),
+                    dbc.Tab(label="What If", children=[
+                        html.Br(),
+                        interest_controls,
+                        what_if_status,
+                        what_if_table
+                    ]),
+                ])
+            ]),
+        ], style={'margin-top': '20px'}),
+        dbc.Row([
+            dbc.Col([
+                html.H3("Transactions"),
+                search_controls,
+                search_status,
+                search_table
+            ]),
+        ], style={'margin-top': '20px', 'margin-bottom': '50px'}),
+        # Unsaved edits of each budget table, as deltas to its monthly totals
+        dcc.Store(id="income-delta"),
+        dcc.Store(id="bills-delta"),
+        dcc.Store(id="expenses-delta"),
+        # Frame versions of the loaded dataset; charts and tables re-render when theirs changes
+        dcc.Store(id="monthly-version"),
+        dcc.Store(id="total-version"),
+        dcc.Store(id="offset-version"),
+        dcc.Store(id="mortgage-version"),
+        # Version of the dataset built by the last "Refresh data", until the server process has installed it
+        dcc.Store(id="refreshed-version"),
+        dcc.Interval(id="dataset-poll", interval=loading_poll_ms),
+    ])
+
+    # Statements are loaded in the background so the server answers straight away with placeholders
+    warm_dataset()
+    watch_dataset()
+
+    return app
+
+
 # Run the Dash app
 if __name__ == '__main__':
-    app.run_server(debug=True)
+    create_app().run_server(debug=True)
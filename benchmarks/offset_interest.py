@@ -0,0 +1,144 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_statements import generate_statements, write_credentials
+from etl.offset_interest import build_interest_periods, reconcile_interest_saved
+from etl.statistics_index import build_statistics_index
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Four statement months worked by hand. Interest accrues daily on the closing balance of each day from one charge to
+# the day before the next, at rate / 365, with the offset balance counted against the loan:
+#   June, 31 May - 29 Jun (30 days), loan $400,000.00, 6.00%
+#     offset $20,000 for 15 days then $25,000 for 15 days: 675,000 dollar-days
+#     saved   675,000 x 0.06 / 365                            = $110.96
+#     charged (400,000 x 30 - 675,000) x 0.06 / 365           = $1,861.64
+#   July, 30 Jun - 30 Jul (31 days), loan $398,861.64 after the charge and a $3,000 repayment, 6.00%
+#     offset $22,000 for 10 days then $20,000 for 21 days: 640,000 dollar-days
+#     saved   640,000 x 0.06 / 365                            = $105.21
+#     charged (398,861.64 x 31 - 640,000) x 0.06 / 365        = $1,927.35
+#   August, 31 Jul - 30 Aug (31 days), loan $397,788.99, the rate moves to 6.50%
+#     offset $17,000 throughout: 527,000 dollar-days
+#     saved   527,000 x 0.065 / 365                           = $93.85
+#     charged (397,788.99 x 31 - 527,000) x 0.065 / 365       = $2,102.16
+#   September, 31 Aug - 29 Sep (30 days), loan $396,891.15, 6.50%
+#     offset $14,000 throughout: 420,000 dollar-days
+#     saved   420,000 x 0.065 / 365                           = $74.79, but the statement says $150.00
+# (month, days, rate %, interest charged, interest saved on the statement, interest saved worked by hand)
+hand_worked = [
+    ('2024-06', 30, 6.00, 1861.64, 110.96, 110.96),
+    ('2024-07', 31, 6.00, 1927.35, 105.21, 105.21),
+    ('2024-08', 31, 6.50, 2102.16, 93.85, 93.85),
+    ('2024-09', 30, 6.50, 2045.58, 150.00, 74.79),
+]
+# The rate is implied from a charge rounded to the cent, which moves the calculated saving by well under a cent
+hand_worked_tolerance = 0.01
+
+
+def hand_worked_statements():
+    # Offset and mortgage transactions in the ingested schema, amounts in cents
+    offset = pd.DataFrame([
+        ('2024-05-31', 'OPENING BALANCE', 2000000, 2000000),
+        ('2024-06-15', 'SALARY ACME PTY LTD', 500000, 2500000),
+        ('2024-06-30', 'TFR TO 12345678 TFR', -300000, 2200000),
+        ('2024-07-10', 'BUNNINGS', -200000, 2000000),
+        ('2024-07-31', 'TFR TO 12345678 TFR', -300000, 1700000),
+        ('2024-08-31', 'TFR TO 12345678 TFR', -300000, 1400000),
+        ('2024-09-30', 'TFR TO 12345678 TFR', -300000, 1100000),
+    ], columns=['transactionDate', 'description', 'credit', 'balance'])
+    offset['txn_type'] = np.where(offset['description'].str.startswith('TFR TO'), 'transfer', 'other')
+
+    mortgage = pd.DataFrame([
+        ('2024-05-31', 'Loan Interest', -200000, -40300000, None, 'interest'),
+        ('2024-05-31', 'TFR FROM 12345678 TFR', 300000, -40000000, None, 'repayment'),
+    ] + [row for month, charge, saved, balance in [
+        ('2024-06-30', 186164, 11096, -40000000),
+        ('2024-07-31', 192735, 10521, -39886164),
+        ('2024-08-31', 210216, 9385, -39778899),
+        ('2024-09-30', 204558, 15000, -39689115),
+    ] for row in [
+        (month, 'Loan Interest', -charge, balance - charge, None, 'interest'),
+        (month, f'Offset interest saved ${saved / 100:.2f}', 0, balance - charge, saved, 'other'),
+        (month, 'TFR FROM 12345678 TFR', 300000, balance - charge + 300000, None, 'repayment'),
+    ]], columns=['transactionDate', 'description', 'credit', 'balance', 'amount_in_description', 'txn_type'])
+
+    for df, account in ((offset, 'offset'), (mortgage, 'mortgage')):
+        df['account'] = pd.Categorical([account] * len(df))
+        df['transactionDate'] = pd.to_datetime(df['transactionDate'])
+        df['txn_type'] = pd.Categorical(df['txn_type'])
+    mortgage['amount_in_description'] = mortgage['amount_in_description'].astype('Int64')
+    return offset, mortgage
+
+
+def check_hand_worked():
+    offset, mortgage = hand_worked_statements()
+    index = build_statistics_index(offset, mortgage)
+    reconciled = reconcile_interest_saved(index, build_interest_periods(index, mortgage)).set_index('Month')
+
+    print(f'  {"month":<8} {"days":>4} {"rate":>6} {"charged":>9} {"statement":>10} {"by hand":>8} '
+          f'{"engine":>8}  flagged')
+    failures = []
+    for month, days, rate, charged, statement, by_hand in hand_worked:
+        row = reconciled.loc[month]
+        print(f'  {month:<8} {row["Days"]:>4} {row["Rate"]:>5.2f}% {row["Interest Charged"]:>9,.2f} '
+              f'{row["Interest Saved"]:>10,.2f} {by_hand:>8,.2f} {row["Calculated Interest Saved"]:>8,.2f}  '
+              f'{"yes" if row["Diverges"] else "no"}')
+        if (row['Days'] != days or abs(row['Rate'] - rate) > 0.005 or row['Interest Charged'] != charged
+                or abs(row['Calculated Interest Saved'] - by_hand) > hand_worked_tolerance
+                or row['Diverges'] != (statement != by_hand)):
+            failures.append(month)
+    print(f'  {len(hand_worked) - len(failures)} of {len(hand_worked)} months match the hand-worked figures '
+          f'within ${hand_worked_tolerance:.2f}, and only the misstated one is flagged')
+    return failures
+
+
+# Runs in a directory holding credentials.py and the generated statements
+synthetic_script = '''
+import json
+import numpy as np
+from etl.offset_interest import build_interest_periods, reconcile_interest_saved
+from etl.process_statements import process_offset_statements, process_mortgage_statements
+from etl.statistics_index import build_statistics_index
+
+offset, mortgage = process_offset_statements(), process_mortgage_statements()
+index = build_statistics_index(offset, mortgage)
+reconciled = reconcile_interest_saved(index, build_interest_periods(index, mortgage)).dropna(subset=['Interest Saved'])
+share = (reconciled['Difference'] / reconciled['Calculated Interest Saved']).abs().to_numpy()
+print(json.dumps({'months': len(reconciled), 'flagged': int(reconciled['Diverges'].sum()),
+                  'median': float(np.median(share)), 'p90': float(np.percentile(share, 90)), 'max': float(share.max())}))
+'''
+
+
+def check_synthetic(years):
+    # The synthetic statements report interest saved on the month-end offset balance, an approximation of the
+    # bank's daily calculation, so they are expected to diverge by about as much as the offset balance moves within
+    # a month
+    with tempfile.TemporaryDirectory() as root:
+        write_credentials(root)
+        generate_statements(os.path.join(root, 'data'), years=years)
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, repo_root]))
+        output = subprocess.run([sys.executable, '-c', synthetic_script], cwd=root, env=env, check=True,
+                                capture_output=True, text=True).stdout
+    report = json.loads(output.splitlines()[-1])
+    print(f'  {report["months"]} months, {report["flagged"]} flagged; month-end figures differ from the daily ones by '
+          f'{report["median"]:.1%} at the median, {report["p90"]:.1%} at the 90th percentile, {report["max"]:.1%} '
+          f'at most')
+
+
+def main(years=10):
+    print('Hand-worked months:')
+    failures = check_hand_worked()
+    print(f'Synthetic statements ({years} years):')
+    check_synthetic(years)
+    if failures:
+        sys.exit(f'Months not matching the hand-worked figures: {", ".join(failures)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from etl.recurring_payments import detect_recurring_payments
+
+# (description, amount in dollars, days between payments, days of jitter) of the bills planted in the history
+planted_bills = [
+    ('NETFLIX.COM 8002', 22.99, 'M', 0),
+    ('ORIGIN ENERGY 4411 BPAY', 310.00, 'Q', 3),
+    ('ANYTIME FITNESS 02', 27.50, 14, 0),
+    ('NRMA INSURANCE POLICY 77120', 1150.00, 'Y', 5),
+    ('TELSTRA PREPAID 0412 000 111', 45.00, 'M', 2),
+    ('KIDS SWIM SCHOOL', 19.00, 7, 1),
+]
+merchants = ['WOOLWORTHS', 'COLES', 'SHELL', 'AMAZON AU', 'UBER *TRIP', 'BUNNINGS', 'ALDI STORES', 'KMART', 'CALTEX']
+
+
+def bill_dates(start, end, every, jitter, rng):
+    if isinstance(every, int):
+        dates = pd.date_range(start, end, freq=f'{every}D')
+    else:
+        dates = pd.date_range(start, end, freq={'M': 'MS', 'Q': 'QS', 'Y': 'YS'}[every]) + pd.Timedelta(days=9)
+    dates = dates + pd.to_timedelta(rng.integers(-jitter, jitter + 1, len(dates)), unit='D')
+    return dates[dates < end]
+
+
+def synthetic_offset(years, transactions_per_day, seed=0):
+    # Offset transactions in the ingested schema: card spending at random merchants plus the planted bills
+    rng = np.random.default_rng(seed)
+    start, end = pd.Timestamp('2014-01-01'), pd.Timestamp('2014-01-01') + pd.DateOffset(years=years)
+    count = int((end - start).days * transactions_per_day)
+    dates = [start + pd.to_timedelta(rng.integers(0, (end - start).days, count), unit='D')]
+    descriptions = [np.char.add(rng.choice(merchants, count).astype(str), rng.integers(100, 999, count).astype(str))]
+    amounts = [-np.round(rng.gamma(2.0, 3000.0, count))]
+    for description, amount, every, jitter in planted_bills:
+        paid = bill_dates(start, end, every, jitter, rng)
+        dates.append(paid)
+        descriptions.append(np.full(len(paid), description))
+        amounts.append(np.full(len(paid), -round(amount * 100)) + rng.integers(-100, 101, len(paid)) * (amount > 100))
+    offset = pd.DataFrame({
+        'transactionDate': np.concatenate([np.asarray(d, dtype='datetime64[ns]') for d in dates]),
+        'description': pd.Categorical(np.concatenate(descriptions)),
+        'credit': np.concatenate(amounts).astype(np.int64),
+        'txn_type': pd.Categorical(['other'] * sum(len(d) for d in descriptions)),
+    })
+    return offset.sort_values('transactionDate', kind='stable', ignore_index=True)
+
+
+def main(years=10, transactions_per_day=40):
+    offset = synthetic_offset(years, transactions_per_day)
+    started = time.perf_counter()
+    recurring = detect_recurring_payments(offset)
+    seconds = time.perf_counter() - started
+
+    print(f'{years} years, {len(offset):,} offset transactions, {offset["description"].nunique():,} descriptions: '
+          f'detected {len(recurring)} recurring payments in {seconds * 1000:.0f} ms')
+    print(recurring.to_string(index=False))
+    print(f'{len(recurring)} detected for {len(planted_bills)} planted bills')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic_statements import generate_statements, write_credentials
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the generated tree: statistics from the incremental rollups must equal a full rebuild from raw rows
+check_script = '''
+import sys, time
+import pandas as pd
+from etl.process_statements import process_offset_mortgage_statistics, extract_offset_mortgage_statistics
+
+start = time.perf_counter()
+offset, mortgage, monthly_df, total_df = process_offset_mortgage_statistics()
+elapsed = time.perf_counter() - start
+expected_monthly_df, expected_total_df = extract_offset_mortgage_statistics(offset.copy(), mortgage.copy())
+pd.testing.assert_frame_equal(monthly_df, expected_monthly_df)
+pd.testing.assert_frame_equal(total_df, expected_total_df)
+print(elapsed, len(monthly_df))
+'''
+
+
+def check(root, label):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, repo_root]))
+    output = subprocess.run([sys.executable, '-c', check_script], cwd=root, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    elapsed, months = output.split()
+    print(f'{label:<44} {months:>4} months, matches full rebuild, {float(elapsed) * 1000:7.1f} ms')
+
+
+def main(years=10, transactions_per_day=10):
+    with tempfile.TemporaryDirectory() as root:
+        write_credentials(root)
+        incoming = os.path.join(root, 'incoming')
+        data_dir = os.path.join(root, 'data')
+        generate_statements(incoming, years=years, transactions_per_day=transactions_per_day)
+        os.makedirs(data_dir)
+
+        months = sorted({name.split('_', 1)[1] for name in os.listdir(incoming)})
+
+        def ingest(month):
+            for kind in ('offset', 'mortgage'):
+                name = f'{kind}_{month}'
+                os.replace(os.path.join(incoming, name), os.path.join(data_dir, name))
+
+        for month in months[:-3]:
+            ingest(month)
+        check(root, 'initial build')
+        check(root, 'no new statements')
+
+        for month in months[-3:]:
+            ingest(month)
+            check(root, f'added {month[:-4]}')
+
+        removed = sorted(os.listdir(data_dir))[len(months) // 2]
+        os.replace(os.path.join(data_dir, removed), os.path.join(incoming, removed))
+        check(root, f'removed {removed}')
+
+        with open(os.path.join(incoming, removed)) as f:
+            lines = f.readlines()
+        with open(os.path.join(data_dir, removed), 'w') as f:
+            f.writelines(lines[:-1])
+        check(root, f'restored {removed} minus a row')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+from glob import glob
+from time import perf_counter
+
+import pandas as pd
+
+from benchmarks.synthetic_statements import generate_statements
+from etl.statement_parser import read_statements
+
+
+def read_statements_legacy(csv_files):
+    # The loader as it was before the shared parser: type inference and a date string round trip
+    dfs = [pd.read_csv(csv_file) for csv_file in csv_files]
+    final_df = pd.concat(dfs, ignore_index=True)
+    final_df.columns = ['transactionDate', 'processedDate', 'description', 'a', 'credit', 'balance']
+    final_df['transactionDate'] = pd.to_datetime(final_df['transactionDate'], format='%d %b %Y')
+    final_df['transactionDate'] = final_df['transactionDate'].dt.strftime('%Y-%m-%d')
+    final_df['transactionDate'] = pd.to_datetime(final_df['transactionDate'])
+    return final_df
+
+
+def best_of(func, *args, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func(*args)
+        timings.append(perf_counter() - start)
+    return min(timings)
+
+
+def main(years=10):
+    with tempfile.TemporaryDirectory() as data_dir:
+        generate_statements(data_dir, years=years)
+        csv_files = sorted(glob(os.path.join(data_dir, 'offset*'))) + sorted(glob(os.path.join(data_dir, 'mortgage*')))
+        rows = len(read_statements(csv_files))
+
+        legacy = best_of(read_statements_legacy, csv_files)
+        shared = best_of(read_statements, csv_files)
+
+    print(f'{len(csv_files)} files, {rows} rows ({years} years)')
+    print(f'legacy pandas loader: {legacy * 1000:8.1f} ms')
+    print(f'shared arrow parser:  {shared * 1000:8.1f} ms  ({legacy / shared:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
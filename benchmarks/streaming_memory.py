@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic_statements import generate_statements, write_credentials
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each mode runs in a fresh interpreter so ru_maxrss reflects that mode alone
+batch_script = '''
+import resource
+from etl.process_statements import process_offset_statements, process_mortgage_statements, \\
+    extract_offset_mortgage_statistics
+extract_offset_mortgage_statistics(process_offset_statements(), process_mortgage_statements())
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+'''
+
+streaming_script = '''
+import resource, sys
+from etl.process_statements import stream_offset_mortgage_statistics
+stream_offset_mortgage_statistics(int(sys.argv[1]))
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+'''
+
+
+def peak_rss_mb(root, script, *args):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, repo_root]))
+    output = subprocess.run([sys.executable, '-c', script, *args], cwd=root, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.split()[-1])
+
+
+def main(years=30, transactions_per_day=40):
+    with tempfile.TemporaryDirectory() as root:
+        write_credentials(root)
+        generate_statements(os.path.join(root, 'data'), years=years, transactions_per_day=transactions_per_day)
+
+        print(f'{years} years, ~{transactions_per_day} transactions per day')
+        print(f'batch loader:            {peak_rss_mb(root, batch_script):7.1f} MB peak RSS')
+        for chunk_size in (1 << 16, 1 << 20, 1 << 24):
+            rss = peak_rss_mb(root, streaming_script, str(chunk_size))
+            print(f'streaming, {chunk_size:>8} B:   {rss:7.1f} MB peak RSS')
+
+
+if __name__ == '__main__':
+    main()
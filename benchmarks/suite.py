@@ -0,0 +1,154 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic_statements import generate_tree
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+baselines_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+# Data sizes the suite runs at: years of statements, transactions per day and rows per budget table
+scales = {
+    'small': {'years': 3, 'transactions_per_day': 5, 'budget_rows': 20},
+    'medium': {'years': 10, 'transactions_per_day': 20, 'budget_rows': 200},
+    'large': {'years': 30, 'transactions_per_day': 40, 'budget_rows': 2000},
+}
+
+# A measurement fails when it is this much slower than its baseline, and by more than the noise floor in seconds
+default_tolerance = 0.5
+noise_floor = 0.001
+
+
+def benchmark_cases():
+    # Imported here because the app modules read credentials.py and data/ from the working directory
+    import shutil
+
+    from callbacks import budget_storage, income_expenses
+    from etl import offset_interest, process_statements, recurring_payments, statistics_index
+    from etl.statement_store import store_dir
+
+    def clear_store():
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    def clear_budget_caches():
+        budget_storage.table_cache.clear()
+        income_expenses.summary_cache.clear()
+        income_expenses.budget_frames.clear()
+        income_expenses.budget_totals.clear()
+
+    offset = process_statements.process_offset_statements()
+    mortgage = process_statements.process_mortgage_statements()
+    index = statistics_index.build_statistics_index(offset, mortgage)
+    periods = offset_interest.build_interest_periods(index, mortgage)
+
+    # name: (setup run untimed before each repeat, the function timed)
+    cases = {
+        'process_offset_statements (cold store)': (clear_store, process_statements.process_offset_statements),
+        'process_offset_statements (warm store)': (None, process_statements.process_offset_statements),
+        'process_mortgage_statements (cold store)': (clear_store, process_statements.process_mortgage_statements),
+        'process_mortgage_statements (warm store)': (None, process_statements.process_mortgage_statements),
+        'extract_offset_mortgage_statistics': (
+            None, lambda: process_statements.extract_offset_mortgage_statistics(offset, mortgage)),
+        'build_statistics_index': (None, lambda: statistics_index.build_statistics_index(offset, mortgage)),
+        'period_statistics (quarterly, one year)': (
+            None, lambda: statistics_index.period_statistics(index, '2015-01-01', '2015-12-31', 'Q')),
+        'range_totals (one year)': (None, lambda: statistics_index.range_totals(index, '2015-01-01', '2015-12-31')),
+        'reconcile_interest_saved': (None, lambda: offset_interest.reconcile_interest_saved(index, periods)),
+        'interest_saved_scenarios (60 candidates)': (
+            None, lambda: offset_interest.interest_saved_scenarios(index, periods, [-1, -0.5, 0, 0.5, 1],
+                                                                   range(-20000, 100000, 10000))),
+        'detect_recurring_payments': (None, lambda: recurring_payments.detect_recurring_payments(offset)),
+        'compute_summary (cold)': (clear_budget_caches, income_expenses.compute_summary),
+        'compute_summary (cached)': (None, income_expenses.compute_summary),
+    }
+    for tab in ('summary-tab', 'income-tab', 'bills-tab', 'expenses-tab'):
+        cases[f'update_tab_content[{tab}]'] = (clear_budget_caches,
+                                               lambda tab=tab: income_expenses.update_tab_content(tab))
+        cases[f'update_pie_chart[{tab}]'] = (clear_budget_caches,
+                                             lambda tab=tab: income_expenses.update_pie_chart(tab))
+    return cases
+
+
+def measure(repeat):
+    # Runs inside the generated tree; prints the best time of each case in seconds as JSON
+    from time import perf_counter
+
+    timings = {}
+    for name, (setup, func) in benchmark_cases().items():
+        best = float('inf')
+        for _ in range(repeat):
+            if setup:
+                setup()
+            start = perf_counter()
+            func()
+            best = min(best, perf_counter() - start)
+        timings[name] = best
+    print(json.dumps(timings))
+
+
+def run_scale(scale, repeat):
+    with tempfile.TemporaryDirectory() as root:
+        generate_tree(root, **scales[scale])
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, repo_root]))
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.suite', '--measure', '--repeat', str(repeat)],
+                                cwd=root, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def load_baselines():
+    try:
+        with open(baselines_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ETL and callbacks against stored baselines')
+    parser.add_argument('--scale', action='append', choices=list(scales),
+                        help='Data size to run at; may be repeated (default: small and medium)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per case; the best is kept')
+    parser.add_argument('--tolerance', type=float, default=default_tolerance,
+                        help='Allowed slowdown over the baseline as a fraction (default: %(default)s)')
+    parser.add_argument('--update-baselines', action='store_true', help='Store these timings as the new baselines')
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.repeat)
+        return
+
+    baselines = load_baselines()
+    regressions = []
+    for scale in args.scale or ['small', 'medium']:
+        timings = run_scale(scale, args.repeat)
+        print(f'{scale}: {scales[scale]}')
+        for name, seconds in timings.items():
+            baseline = baselines.get(scale, {}).get(name)
+            if baseline is None:
+                status = 'no baseline'
+            elif seconds > baseline * (1 + args.tolerance) and seconds - baseline > noise_floor:
+                status = f'REGRESSION ({seconds / baseline:.2f}x baseline)'
+                regressions.append(f'{scale} {name}')
+            else:
+                status = f'ok ({seconds / baseline:.2f}x baseline)'
+            print(f'  {name:<44} {seconds * 1000:9.2f} ms  {status}')
+
+        if args.update_baselines:
+            baselines[scale] = {name: round(seconds, 6) for name, seconds in timings.items()}
+
+    if args.update_baselines:
+        with open(baselines_path, 'w') as f:
+            json.dump(baselines, f, indent=1, sort_keys=True)
+            f.write('\n')
+        print(f'Baselines written to {baselines_path}')
+    elif regressions:
+        print(f'{len(regressions)} regression(s): ' + ', '.join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
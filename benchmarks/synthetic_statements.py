@@ -0,0 +1,130 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+statement_columns = ['Transaction Date', 'Processed Date', 'Description', 'Reference', 'Credit', 'Balance']
+
+budget_columns = ['Name', 'Amount', 'Category', 'Frequency']
+
+# (name, category, typical amount, frequency) per budget table
+budget_items = {
+    'income': [('Salary', 'Work', 4200, 'Fortnightly'), ('Rental Income', 'Property', 450, 'Weekly'),
+               ('Dividends', 'Investments', 1200, 'Quarterly'), ('Tax Refund', 'Government', 1500, 'Yearly')],
+    'bills': [('Electricity', 'Utilities', 320, 'Quarterly'), ('Internet', 'Utilities', 85, 'Monthly'),
+              ('Phone', 'Utilities', 45, 'Monthly'), ('Car Insurance', 'Insurance', 1100, 'Yearly'),
+              ('Council Rates', 'Property', 480, 'Quarterly'), ('Streaming', 'Entertainment', 23, 'Monthly')],
+    'expenses': [('Groceries', 'Food', 220, 'Weekly'), ('Fuel', 'Transport', 70, 'Weekly'),
+                 ('Dining Out', 'Food', 120, 'Fortnightly'), ('Gym', 'Health', 60, 'Monthly'),
+                 ('Clothing', 'Shopping', 400, 'Quarterly'), ('Holidays', 'Travel', 4000, 'Yearly')],
+}
+
+merchants = ['WOOLWORTHS 1234', 'COLES 0457', 'NETFLIX.COM', 'SHELL 4432', 'AMAZON AU', 'UBER *TRIP', 'BUNNINGS 231']
+
+
+def write_statement(path, dates, descriptions, credits, balances):
+    formatted_dates = pd.DatetimeIndex(dates).strftime('%d %b %Y')
+    pd.DataFrame({
+        'Transaction Date': formatted_dates,
+        'Processed Date': formatted_dates,
+        'Description': descriptions,
+        'Reference': '',
+        'Credit': np.round(credits, 2),
+        'Balance': np.round(balances, 2),
+    }, columns=statement_columns).to_csv(path, index=False)
+
+
+def write_credentials(root, account_number='12345678', start_date='2014-01-01'):
+    with open(os.path.join(root, 'credentials.py'), 'w') as f:
+        f.write(f"accountNumber = '{account_number}'\nstartDate = '{start_date}'\n")
+
+
+def generate_statements(data_dir, years=10, transactions_per_day=3, account_number='12345678',
+                        start='2014-01-01', loan_amount=600000.0, rate=0.06, repayment=3500.0, seed=0):
+    # One offset and one mortgage export per month, in the bank's six-column format
+    rng = np.random.default_rng(seed)
+    os.makedirs(data_dir, exist_ok=True)
+
+    offset_balance = 20000.0
+    mortgage_balance = -loan_amount
+
+    for month in pd.period_range(start, periods=years * 12, freq='M'):
+        days = pd.date_range(month.start_time, month.end_time.normalize(), freq='D')
+
+        counts = rng.poisson(transactions_per_day, len(days))
+        dates = np.repeat(days.values, counts)
+        spend = -np.round(rng.gamma(2.0, 30.0, len(dates)), 2)
+        descriptions = rng.choice(merchants, len(dates))
+
+        dates = np.concatenate([dates, days.values[[14, -1]]])
+        descriptions = np.concatenate([descriptions, ['SALARY ACME PTY LTD', f'TFR TO {account_number} TFR']])
+        salary = round(-spend.sum() + repayment + 500.0, -2)
+        credits = np.concatenate([spend, [salary, -repayment]])
+
+        order = np.argsort(dates, kind='stable')
+        dates, descriptions, credits = dates[order], descriptions[order], credits[order]
+        balances = offset_balance + np.cumsum(credits)
+        offset_balance = balances[-1]
+        write_statement(os.path.join(data_dir, f'offset_{month}.csv'), dates, descriptions, credits, balances)
+
+        interest = round((-mortgage_balance - offset_balance) * rate / 12, 2)
+        interest_saved = round(offset_balance * rate / 12, 2)
+        credits = np.array([-interest, 0.0, repayment])
+        balances = mortgage_balance + np.cumsum(credits)
+        mortgage_balance = balances[-1]
+        write_statement(
+            os.path.join(data_dir, f'mortgage_{month}.csv'),
+            [days[-1]] * 3,
+            ['Loan Interest', f'Offset Interest Saved ${interest_saved:.2f}', f'TFR FROM {account_number} TFR'],
+            credits,
+            balances,
+        )
+
+
+def generate_budget_tables(data_dir, rows=20, seed=0):
+    # income.csv, bills.csv and expenses.csv with `rows` rows each, cycling through typical items
+    rng = np.random.default_rng(seed)
+    os.makedirs(data_dir, exist_ok=True)
+
+    for table, items in budget_items.items():
+        picks = [items[i % len(items)] for i in range(rows)]
+        names = [name if i < len(items) else f'{name} {i // len(items) + 1}' for i, (name, *_) in enumerate(picks)]
+        amounts = np.round([amount for _, _, amount, _ in picks] * rng.uniform(0.8, 1.2, rows), 2)
+        pd.DataFrame({
+            'Name': names,
+            'Amount': amounts,
+            'Category': [category for _, category, _, _ in picks],
+            'Frequency': [frequency for *_, frequency in picks],
+        }, columns=budget_columns).to_csv(os.path.join(data_dir, f'{table}.csv'), index=False)
+
+
+def generate_tree(root, years=10, transactions_per_day=3, budget_rows=20, account_number='12345678',
+                  start_date='2014-01-01', seed=0):
+    # A complete working directory for the app: credentials.py and data/ with statements and budget tables
+    os.makedirs(root, exist_ok=True)
+    write_credentials(root, account_number=account_number, start_date=start_date)
+    data_dir = os.path.join(root, 'data')
+    generate_statements(data_dir, years=years, transactions_per_day=transactions_per_day,
+                        account_number=account_number, start=start_date, seed=seed)
+    generate_budget_tables(data_dir, rows=budget_rows, seed=seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write synthetic bank statements and budget tables')
+    parser.add_argument('root', help='Directory to create credentials.py and data/ in')
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--transactions-per-day', type=float, default=3)
+    parser.add_argument('--budget-rows', type=int, default=20)
+    parser.add_argument('--account-number', default='12345678')
+    parser.add_argument('--start-date', default='2014-01-01')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    generate_tree(args.root, years=args.years, transactions_per_day=args.transactions_per_day,
+                  budget_rows=args.budget_rows, account_number=args.account_number, start_date=args.start_date,
+                  seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
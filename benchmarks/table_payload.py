@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+from plotly.io.json import to_json_plotly
+
+from callbacks.table_paging import page_records
+from layouts.statistics_tables import monthly_columns, monthly_page_size
+
+
+def synthetic_monthly_df(years, seed=0):
+    rng = np.random.default_rng(seed)
+    months = pd.period_range('2000-01', periods=years * 12, freq='M').strftime('%Y-%m')
+    values = rng.uniform(0, 600000, (len(months), len(monthly_columns) - 1)).round(0)
+    df = pd.DataFrame(values, columns=monthly_columns[1:])
+    df.insert(0, 'Month', months)
+    return df[::-1]
+
+
+def payload_bytes(records):
+    # Callback responses are serialised the same way by Dash
+    return len(to_json_plotly(records))
+
+
+def main():
+    for years in (10, 30):
+        monthly_df = synthetic_monthly_df(years)
+        full = payload_bytes(monthly_df.to_dict('records'))
+        page, _ = page_records('monthly-view-table', years, monthly_df, 0, monthly_page_size, [], '')
+        paged = payload_bytes(page)
+        print(f'{years} years ({len(monthly_df)} rows): full table {full:7d} B, first page {paged:6d} B '
+              f'({full / paged:.0f}x smaller)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic_statements import generate_statements, write_credentials
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the generated tree. The float frames are built from the same ingested rows the way they were before
+# transactions were kept in integer cents, so both schemas hold exactly the same transactions.
+report_script = '''
+import json
+import pandas as pd
+from credentials import startDate
+from etl.process_statements import sync_offset_statements, sync_mortgage_statements, process_offset_statements, \\
+    process_mortgage_statements, account_columns, to_dollars
+
+
+def float_statements(final_df, columns):
+    df = final_df.astype({'description': object})
+    df['month'] = df['transactionDate'].dt.to_period('M')
+    return df[df['transactionDate'] > startDate].reset_index()[columns]
+
+
+report = {}
+for kind, sync, process in (('offset', sync_offset_statements, process_offset_statements),
+                            ('mortgage', sync_mortgage_statements, process_mortgage_statements)):
+    final_df = sync()
+    before = float_statements(final_df, account_columns[kind])
+    if kind == 'offset':
+        before = before.dropna(subset=['description', 'credit', 'balance'])
+    after = process(final_df)
+
+    credit_cents = after.groupby('month')['credit'].sum()
+    credit_dollars = before.groupby('month')['credit'].sum()
+    report[kind] = {
+        'rows': len(after),
+        'before': before.memory_usage(index=False, deep=True).to_dict(),
+        'after': after.memory_usage(index=False, deep=True).to_dict(),
+        'credit_total': [before['credit'].sum(), int(after['credit'].sum())],
+        'months_matching': int((credit_dollars.round(2).to_numpy() == to_dollars(credit_cents).to_numpy()).sum()),
+        'months': len(credit_cents),
+        'max_float_drift': float(abs(credit_dollars.to_numpy() * 100 - credit_cents.to_numpy(dtype=float)).max()),
+        'balances_match': bool((to_dollars(after['balance']).fillna(0) == before['balance'].fillna(0)).all()),
+    }
+print(json.dumps(report))
+'''
+
+
+def measure(root):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, repo_root]))
+    output = subprocess.run([sys.executable, '-c', report_script], cwd=root, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main(years=30, transactions_per_day=40):
+    with tempfile.TemporaryDirectory() as root:
+        write_credentials(root)
+        generate_statements(os.path.join(root, 'data'), years=years, transactions_per_day=transactions_per_day)
+        report = measure(root)
+
+    print(f'{years} years, ~{transactions_per_day} transactions per day')
+    for kind, result in report.items():
+        before, after = result['before'], result['after']
+        print(f'\n{kind}: {result["rows"]} rows')
+        print(f'  {"column":<24} {"float frame":>12} {"cents frame":>12}')
+        for col in before:
+            print(f'  {col:<24} {before[col]:>12,} {after[col]:>12,}')
+        total_before, total_after = sum(before.values()), sum(after.values())
+        print(f'  {"total":<24} {total_before:>12,} {total_after:>12,}  ({total_before / total_after:.1f}x smaller, '
+              f'{total_after / years / 1e6:.2f} MB per year)')
+
+        credit_dollars, credit_cents = result['credit_total']
+        print(f'  credit total: float {credit_dollars:.6f}, cents {credit_cents} (${credit_cents / 100:,.2f})')
+        print(f'  monthly credit totals matching to the cent: {result["months_matching"]} of {result["months"]}, '
+              f'largest float drift {result["max_float_drift"]:.2e} cents')
+        print(f'  balances identical: {result["balances_match"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic_statements import write_credentials
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a directory holding credentials.py. The frames have the schema of process_offset_statements and
+# process_mortgage_statements, with merchant, store and reference numbers making many distinct descriptions.
+search_script = '''
+import json
+import sys
+import time
+import numpy as np
+import pandas as pd
+from etl.transaction_search import build_search_index, search_positions, search_records
+
+rows, repeat = int(sys.argv[1]), int(sys.argv[2])
+rng = np.random.default_rng(0)
+merchants = np.array(['WOOLWORTHS', 'COLES', 'NETFLIX.COM', 'SHELL', 'AMAZON AU', 'UBER *TRIP', 'BUNNINGS',
+                      'ALDI STORES', 'JB HI-FI', 'KMART', 'CALTEX', 'OFFICEWORKS', 'TFR TO', 'DIRECT DEBIT'])
+
+
+def statements(count, account):
+    descriptions = np.char.add(np.char.add(rng.choice(merchants, count).astype(str), ' '),
+                               rng.integers(0, 5000, count).astype(str))
+    credits = -np.round(rng.gamma(2.0, 3000.0, count)).astype(np.int64)
+    return pd.DataFrame({
+        'account': pd.Categorical([account] * count),
+        'transactionDate': np.sort(rng.integers(np.datetime64('1995-01-01', 'ns').astype(np.int64),
+                                                np.datetime64('2025-01-01', 'ns').astype(np.int64),
+                                                count)).astype('datetime64[ns]'),
+        'description': pd.Categorical(descriptions),
+        'credit': credits,
+        'balance': np.cumsum(credits) + 10_000_000,
+        'txn_type': pd.Categorical(['other'] * count, categories=['repayment', 'interest', 'other']),
+    })
+
+
+offset, mortgage = statements(rows - rows // 50, 'offset'), statements(rows // 50, 'mortgage')
+started = time.perf_counter()
+index = build_search_index((offset, mortgage))
+build_seconds = time.perf_counter() - started
+
+both = pd.concat([offset, mortgage], ignore_index=True)
+queries = [
+    ('woolworths', {}),
+    ('wool 12', {}),
+    ('hi-fi', {}),
+    ('co', {}),
+    ('tfr to 4999', {}),
+    ('shell', {'start_date': '2010-01-01', 'end_date': '2010-12-31'}),
+    ('', {'start_date': '2020-01-01', 'min_amount': -50, 'max_amount': -10}),
+    ('netflix', {'min_amount': -100}),
+]
+report = {'rows': len(both), 'descriptions': len(index.descriptions), 'build_ms': build_seconds * 1000, 'queries': []}
+for query, filters in queries:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        positions = search_positions(index, query, **filters)
+        search_records(index, positions[:20])
+        timings.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    mask = pd.Series(True, index=both.index)
+    for token in query.split():
+        mask &= both['description'].astype(str).str.contains(token, case=False, regex=False)
+    scan_ms = (time.perf_counter() - started) * 1000
+    if not filters:
+        assert mask.sum() == len(positions), query
+    report['queries'].append({'query': query, 'filters': filters, 'matches': len(positions),
+                              'best_ms': min(timings) * 1000, 'worst_ms': max(timings) * 1000, 'scan_ms': scan_ms})
+print(json.dumps(report))
+'''
+
+
+def main(rows=1_000_000, repeat=5):
+    with tempfile.TemporaryDirectory() as root:
+        write_credentials(root)
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, repo_root]))
+        output = subprocess.run([sys.executable, '-c', search_script, str(rows), str(repeat)], cwd=root, env=env,
+                                check=True, capture_output=True, text=True).stdout
+    report = json.loads(output.splitlines()[-1])
+
+    print(f'{report["rows"]:,} transactions, {report["descriptions"]:,} distinct descriptions, '
+          f'index built in {report["build_ms"]:.0f} ms')
+    print(f'  {"query":<40} {"matches":>9} {"best":>9} {"worst":>9} {"str.contains":>13}')
+    for result in report['queries']:
+        label = ' '.join([repr(result['query'])] + [f'{key}={value}' for key, value in result['filters'].items()])
+        print(f'  {label[:40]:<40} {result["matches"]:>9,} {result["best_ms"]:>7.1f}ms {result["worst_ms"]:>7.1f}ms '
+              f'{result["scan_ms"]:>11.0f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import os
+from threading import Lock
+
+import dash
+import numpy as np
+import pandas as pd
+
+from etl.dataset import get_dataset
+from layouts.mortgage_graphs import scatter_figure
+
+# The balance scatter never sends more points than this, however long the statement history is
+scatter_max_points = int(os.environ.get('FINANCE_TRACKER_SCATTER_POINTS', 2000))
+
+# Offset balances sorted by transaction date for the current offset frame: (frame version, dates in ns, dollars)
+balance_series = (None, np.empty(0, dtype=np.int64), np.empty(0))
+balance_series_lock = Lock()
+
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: keeps the first and last points and, from each bucket in between, the point
+    # forming the largest triangle with the previously kept point and the average of the next bucket
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    next_x = np.append(((cum_x[edges[1:]] - cum_x[edges[:-1]]) / sizes)[1:], x[-1])
+    next_y = np.append(((cum_y[edges[1:]] - cum_y[edges[:-1]]) / sizes)[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[previous] - next_x[i]) * (y[lo:hi] - y[previous])
+                      - (x[previous] - x[lo:hi]) * (next_y[i] - y[previous]))
+        previous = lo + int(area.argmax())
+        selected[i + 1] = previous
+    return selected
+
+
+def offset_balance_series(dataset):
+    global balance_series
+    version, dates, balances = balance_series
+    if version == dataset.frame_versions['offset']:
+        return dates, balances
+
+    with balance_series_lock:
+        if balance_series[0] != dataset.frame_versions['offset']:
+            offset = dataset.offset[['transactionDate', 'balance']].dropna()
+            order = np.argsort(offset['transactionDate'].to_numpy(), kind='stable')
+            balance_series = (
+                dataset.frame_versions['offset'],
+                offset['transactionDate'].to_numpy(dtype='datetime64[ns]')[order].view(np.int64),
+                offset['balance'].to_numpy(dtype=float)[order] / 100,
+            )
+        return balance_series[1:]
+
+
+def zoom_window(relayout_data):
+    # Returns the zoomed x range in ns, or None when the whole history is shown
+    relayout_data = relayout_data or {}
+    if 'xaxis.range[0]' in relayout_data:
+        bounds = relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']
+    elif 'xaxis.range' in relayout_data:
+        bounds = relayout_data['xaxis.range']
+    else:
+        return None
+    return pd.Timestamp(bounds[0]).value, pd.Timestamp(bounds[1]).value
+
+
+def window_points(dates, balances, window, max_points):
+    if window is None:
+        lo, hi = 0, len(dates)
+    else:
+        # Keep one point either side of the window so the trace runs to the edges of the plot
+        lo = max(np.searchsorted(dates, window[0], side='left') - 1, 0)
+        hi = min(np.searchsorted(dates, window[1], side='right') + 1, len(dates))
+
+    dates, balances = dates[lo:hi], balances[lo:hi]
+    if len(dates) > max_points:
+        keep = lttb((dates - dates[0]) / 86400e9, balances, max_points)
+        dates, balances = dates[keep], balances[keep]
+    return dates.view('datetime64[ns]'), balances
+
+
+def update_balance_scatter(relayout_data, offset_version):
+    dataset = get_dataset()
+    if dataset is None or dataset.offset is None:
+        return dash.no_update
+
+    # Zooming only needs a new figure when the x range changed and the zoomed-out view dropped points
+    if dash.callback_context.triggered_id == 'scatter-plot':
+        if len(dataset.offset) <= scatter_max_points or not any(key.startswith('xaxis') for key in relayout_data or {}):
+            return dash.no_update
+
+    dates, balances = offset_balance_series(dataset)
+    dates, balances = window_points(dates, balances, zoom_window(relayout_data), scatter_max_points)
+    # A constant revision keeps the user's zoom when reloaded statements swap in new points
+    return scatter_figure(dates, balances, 'offset-balance')
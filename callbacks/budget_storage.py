@@ -0,0 +1,245 @@
+import argparse
+import io
+import math
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Parsed CSV tables keyed by path, each stored with the (mtime, size) it was read at; least recently used first
+table_cache = OrderedDict()
+table_cache_size = 8
+table_cache_lock = threading.Lock()
+
+
+def file_version(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def cache_table(path, version, df):
+    with table_cache_lock:
+        table_cache[path] = (version, df)
+        table_cache.move_to_end(path)
+        while len(table_cache) > table_cache_size:
+            table_cache.popitem(last=False)
+
+
+def read_table(path, columns):
+    try:
+        version = file_version(path)
+    except FileNotFoundError:
+        return pd.DataFrame(columns=columns)
+
+    with table_cache_lock:
+        cached = table_cache.get(path)
+        if cached and cached[0] == version:
+            table_cache.move_to_end(path)
+            return cached[1].copy()
+
+    df = pd.read_csv(path)
+    cache_table(path, version, df)
+    return df.copy()
+
+
+def write_table(path, df):
+    # Write through the cache: keep the frame exactly as a fresh read of the new file would parse it
+    csv_text = df.to_csv(index=False, header=True)
+    with open(path, 'w') as f:
+        f.write(csv_text)
+    cache_table(path, file_version(path), pd.read_csv(io.StringIO(csv_text)))
+
+
+def clean_value(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def clean_amount(value):
+    amount = pd.to_numeric(value, errors='coerce') if value not in (None, '') else None
+    return None if amount is None or pd.isna(amount) else float(amount)
+
+
+class CsvBudgetStorage:
+    # Each budget table is a whole CSV file, rewritten on save. Row ids are positions in the file.
+
+    def __init__(self, paths, columns, frequency_mapping):
+        self.paths = paths
+        self.columns = columns
+        self.frequency_mapping = frequency_mapping
+
+    def read(self, table):
+        df = read_table(self.paths[table], self.columns)
+        df.insert(0, 'id', range(len(df)))
+        return df
+
+    def save(self, table, rows, replace_ids=None):
+        # Without replace_ids the rows become the whole table; otherwise they replace just the rows with those ids
+        if replace_ids is None:
+            write_table(self.paths[table], pd.DataFrame(rows, columns=self.columns))
+            return
+
+        df = self.read(table).set_index('id')
+        df[self.columns] = df[self.columns].astype(object)
+        updates = [row for row in rows if row.get('id') is not None and row['id'] in df.index]
+        for row in updates:
+            df.loc[row['id'], self.columns] = [row.get(col) for col in self.columns]
+
+        deleted = set(replace_ids) - {row['id'] for row in updates}
+        inserts = pd.DataFrame([row for row in rows if row not in updates], columns=self.columns)
+        df = pd.concat([df[~df.index.isin(deleted)], inserts], ignore_index=True)
+        write_table(self.paths[table], df[self.columns])
+
+    def version(self, table):
+        try:
+            return file_version(self.paths[table])
+        except FileNotFoundError:
+            return None
+
+    def totals(self, table, column):
+        # Total amount, monthly total and {value of `column`: [monthly total, rows]}, from one read of the table
+        df = read_table(self.paths[table], self.columns)
+        amount = monthly = 0.0
+        by = {}
+        for key, value, frequency in zip(df[column], df['Amount'], df['Frequency']):
+            factor = self.frequency_mapping.get(frequency)
+            value = 0.0 if pd.isna(value) else float(value)
+            value_monthly = value * factor if factor is not None else 0.0
+            amount += value
+            monthly += value_monthly
+            if not pd.isna(key):
+                entry = by.setdefault(key, [0.0, 0])
+                entry[0] += value_monthly
+                entry[1] += 1
+        return amount, monthly, by
+
+
+class SqliteBudgetStorage:
+    # Budget tables in one SQLite database in WAL mode, so several workers can read while one writes.
+    # Saves are applied as row-level upserts and deletes, and totals are aggregated in SQL.
+
+    def __init__(self, db_path, tables, columns, frequency_mapping):
+        self.db_path = db_path
+        self.tables = list(tables)
+        self.columns = columns
+        self.frequency_mapping = frequency_mapping
+        self._local = threading.local()
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.create_schema(conn)
+            self._local.conn = conn
+        return conn
+
+    def create_schema(self, conn):
+        with conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS frequencies (Frequency TEXT PRIMARY KEY, factor REAL NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+            conn.executemany('INSERT OR REPLACE INTO frequencies VALUES (?, ?)', self.frequency_mapping.items())
+            for table in self.tables:
+                conn.execute(f'CREATE TABLE IF NOT EXISTS {table} '
+                             f'(id INTEGER PRIMARY KEY, Name TEXT, Amount REAL, Category TEXT, Frequency TEXT)')
+                conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_category ON {table} (Category)')
+                conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_frequency ON {table} (Frequency)')
+
+    def table_name(self, table):
+        if table not in self.tables:
+            raise ValueError(f"Unknown budget table '{table}'")
+        return table
+
+    def read(self, table):
+        query = f'SELECT id, Name, Amount, Category, Frequency FROM {self.table_name(table)} ORDER BY id'
+        return pd.read_sql_query(query, self.connection())
+
+    def save(self, table, rows, replace_ids=None):
+        # Without replace_ids the rows become the whole table; otherwise they replace just the rows with those ids
+        table = self.table_name(table)
+        conn = self.connection()
+        with conn:
+            query = f'SELECT id, {", ".join(self.columns)} FROM {table}'
+            if replace_ids is None:
+                existing = {row[0]: row[1:] for row in conn.execute(query)}
+            else:
+                replace_ids = set(replace_ids)
+                ids = list(replace_ids) + [row['id'] for row in rows if row.get('id') is not None]
+                existing = {row[0]: row[1:] for row in conn.execute(
+                    f'{query} WHERE id IN ({", ".join("?" * len(ids))})', ids)} if ids else {}
+
+            inserts, upserts, seen = [], [], set()
+            for row in rows:
+                values = tuple(clean_amount(row.get(col)) if col == 'Amount' else clean_value(row.get(col))
+                               for col in self.columns)
+                row_id = row.get('id')
+                if row_id is None:
+                    inserts.append(values)
+                    continue
+                seen.add(row_id)
+                if existing.get(row_id) != values:
+                    upserts.append((row_id,) + values)
+
+            deletes = [(row_id,) for row_id in existing if row_id not in seen
+                       and (replace_ids is None or row_id in replace_ids)]
+
+            conn.executemany(f'DELETE FROM {table} WHERE id = ?', deletes)
+            conn.executemany(f'INSERT INTO {table} (id, Name, Amount, Category, Frequency) VALUES (?, ?, ?, ?, ?) '
+                             f'ON CONFLICT(id) DO UPDATE SET Name = excluded.Name, Amount = excluded.Amount, '
+                             f'Category = excluded.Category, Frequency = excluded.Frequency', upserts)
+            conn.executemany(f'INSERT INTO {table} (Name, Amount, Category, Frequency) VALUES (?, ?, ?, ?)', inserts)
+
+            if inserts or upserts or deletes:
+                conn.execute('INSERT INTO table_versions VALUES (?, 1) '
+                             'ON CONFLICT(name) DO UPDATE SET version = version + 1', (table,))
+
+    def version(self, table):
+        row = self.connection().execute('SELECT version FROM table_versions WHERE name = ?',
+                                        (self.table_name(table),)).fetchone()
+        return row[0] if row else 0
+
+    def totals(self, table, column):
+        if column not in self.columns:
+            raise ValueError(f"Unknown budget column '{column}'")
+        query = (f'SELECT t.{column}, TOTAL(t.Amount), TOTAL(t.Amount * f.factor), COUNT(*) '
+                 f'FROM {self.table_name(table)} t LEFT JOIN frequencies f USING (Frequency) '
+                 f'GROUP BY t.{column} ORDER BY t.{column}')
+        rows = self.connection().execute(query).fetchall()
+        by = {key: [monthly, count] for key, _, monthly, count in rows if key is not None}
+        return sum(row[1] for row in rows), sum(row[2] for row in rows), by
+
+
+def migrate_csv_to_sqlite(csv_storage, sqlite_storage, replace=False):
+    migrated = {}
+    for table in sqlite_storage.tables:
+        if not replace and len(sqlite_storage.read(table)):
+            continue
+        rows = csv_storage.read(table).drop(columns='id').to_dict('records')
+        sqlite_storage.save(table, [{col: row.get(col) for col in csv_storage.columns} for row in rows])
+        migrated[table] = len(rows)
+    return migrated
+
+
+def main():
+    from callbacks.income_expenses import budget_db_path, csv_budget_storage, sqlite_budget_storage
+
+    parser = argparse.ArgumentParser(description='Budget table storage maintenance')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    migrate = subcommands.add_parser('migrate', help='Import the budget CSV files into the SQLite database')
+    migrate.add_argument('--replace', action='store_true', help='Overwrite tables that already hold rows')
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        migrated = migrate_csv_to_sqlite(csv_budget_storage(), sqlite_budget_storage(), replace=args.replace)
+        for table, count in migrated.items():
+            print(f'{table}: imported {count} rows into {budget_db_path}')
+        if not migrated:
+            print('Nothing to migrate; use --replace to overwrite existing tables')
+
+
+if __name__ == '__main__':
+    main()
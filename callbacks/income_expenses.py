@@ -1,10 +1,19 @@
+import os
+import threading
+
 import dash_html_components as html
 import dash_table
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
 import pandas as pd
 import dash
 import plotly.graph_objects as go
 
+from callbacks.budget_storage import CsvBudgetStorage, SqliteBudgetStorage, clean_amount
+from callbacks.table_paging import page_records
+from etl.dataset import get_dataset
+from etl.recurring_payments import recurring_columns
+from etl.statement_store import write_atomic
+
 app = dash.Dash(__name__)
 
 income_file_path = 'data/income.csv'
@@ -24,14 +33,65 @@ frequency_mapping = {
 }
 
 
-def create_table(id, df):
+budget_tables = {'income': income_file_path, 'bills': bills_file_path, 'expenses': expenses_file_path}
+
+# Budget tables live in CSV files by default; set FINANCE_TRACKER_BUDGET_STORAGE=sqlite to use data/budget.db
+budget_storage_backend = os.environ.get('FINANCE_TRACKER_BUDGET_STORAGE', 'csv')
+budget_db_path = 'data/budget.db'
+
+
+def csv_budget_storage():
+    return CsvBudgetStorage(budget_tables, visible_columns, frequency_mapping)
+
+
+def sqlite_budget_storage():
+    return SqliteBudgetStorage(budget_db_path, budget_tables, visible_columns, frequency_mapping)
+
+
+storage = sqlite_budget_storage() if budget_storage_backend == 'sqlite' else csv_budget_storage()
+
+
+# Budget tables are paged, sorted and filtered on the server; the browser only holds the visible page
+budget_page_size = 10
+
+
+budget_frames = {}
+
+
+def budget_frame(table):
+    version = storage.version(table)
+    cached = budget_frames.get(table)
+    if cached is None or cached[0] != version:
+        cached = budget_frames[table] = (version, storage.read(table))
+    return cached
+
+
+def page_budget_table(table, page_current, page_size, sort_by, filter_query):
+    version, df = budget_frame(table)
+    records, page_count = page_records(table, version, df, page_current, page_size, sort_by, filter_query)
+    # Blank cells come back from the browser as None, so they are served that way for served and edited rows to
+    # compare equal
+    return [{col: None if pd.isna(value) else value for col, value in row.items()} for row in records], page_count
+
+
+def create_table(id, table):
+    data, page_count = page_budget_table(table, 0, budget_page_size, [], '')
     return dash_table.DataTable(
         id=id,
         columns=[
             {'name': col, 'id': col, 'editable': True} if col != 'Frequency' else
             {'name': col, 'id': col, 'editable': True, 'presentation': 'dropdown'} for col in visible_columns
         ],
-        data=df.to_dict('records'),
+        data=data,
+        page_action='custom',
+        page_current=0,
+        page_size=budget_page_size,
+        page_count=page_count,
+        sort_action='custom',
+        sort_mode='multi',
+        sort_by=[],
+        filter_action='custom',
+        filter_query='',
         editable=True,
         dropdown={
             'Frequency': {
@@ -70,111 +130,264 @@ def add_row(current_data):
     return updated_data
 
 
+def changed_rows(data, data_previous):
+    # Rows edited, added or deleted in the browser: each side's rows that the other side does not hold
+    removed = list(data_previous or [])
+    added = []
+    for row in data or []:
+        if row in removed:
+            removed.remove(row)
+        else:
+            added.append(row)
+    return added, removed
+
+
+def row_totals(table, rows, sign=1):
+    # The rows' share of a table's totals, normalized to monthly amounts through frequency_mapping. Breakdown
+    # entries are [monthly amount, rows]; in a delta, an edited amount changes the first without the second.
+    totals = {'amount': 0.0, 'monthly': 0.0, 'by': {}}
+    column = breakdown_columns[table]
+    for row in rows:
+        amount = clean_amount(row.get('Amount'))
+        factor = frequency_mapping.get(row.get('Frequency'))
+        monthly = amount * factor if amount is not None and factor is not None else 0.0
+        totals['amount'] += sign * (amount or 0.0)
+        totals['monthly'] += sign * monthly
+        if row.get(column) not in (None, '') and not pd.isna(row[column]):
+            entry = totals['by'].setdefault(row[column], [0.0, 0])
+            entry[0] += sign * monthly
+            entry[1] += sign
+    return totals
+
+
+def add_totals(totals, delta):
+    if not delta:
+        return totals
+    by = {key: list(entry) for key, entry in totals['by'].items()}
+    for key, (monthly, count) in delta['by'].items():
+        entry = by.setdefault(key, [0.0, 0])
+        entry[0] += monthly
+        entry[1] += count
+    return {
+        'amount': totals['amount'] + delta['amount'],
+        'monthly': totals['monthly'] + delta['monthly'],
+        # A key goes once its last row does and nothing but float residue is left of its amount
+        'by': {key: entry for key, entry in by.items() if entry[1] != 0 or round(entry[0], 2) != 0},
+    }
+
+
+def edit_delta(table, data, data_previous):
+    added, removed = changed_rows(data, data_previous)
+    return add_totals(row_totals(table, added), row_totals(table, removed, sign=-1))
+
+
+def modify_table(table, add_button_id, save_button_id, add_row_clicks, data_timestamp, save_data_clicks,
+                 page_current, page_size, sort_by, filter_query, current_data, data_previous, unsaved_delta):
+    # Returns the page, its page count and the unsaved edits' delta to the table's totals
+    ctx = dash.callback_context
+    if ctx.triggered_id == add_button_id and add_row_clicks:
+        return add_row(current_data), dash.no_update, dash.no_update
+
+    if f'{table}-table.data_timestamp' in ctx.triggered_prop_ids:
+        # A cell edit or row deletion: the browser already shows it, so only the totals delta is sent back
+        return dash.no_update, dash.no_update, add_totals(unsaved_delta or row_totals(table, []),
+                                                          edit_delta(table, current_data, data_previous))
+
+    if ctx.triggered_id == save_button_id and save_data_clicks:
+        # The page replaces the rows that were served on it: rows missing from it were deleted in the browser
+        served_rows, _ = page_budget_table(table, page_current, page_size, sort_by, filter_query)
+        saved_version = storage.version(table)
+        storage.save(table, current_data, replace_ids=[row['id'] for row in served_rows])
+        commit_totals(table, saved_version, edit_delta(table, current_data, served_rows))
+
+    # Saving or loading another page drops the unsaved edits
+    return (*page_budget_table(table, page_current, page_size, sort_by, filter_query), None)
+
+
 @app.callback(
     Output("income-table", "data"),
+    Output("income-table", "page_count"),
+    Output("income-delta", "data", allow_duplicate=True),
     Input("add-income-row-button", "n_clicks"),
-    Input("income-table", "data"),
+    Input("income-table", "data_timestamp"),
     Input("save-income-button", "n_clicks"),
+    Input("income-table", "page_current"),
+    Input("income-table", "page_size"),
+    Input("income-table", "sort_by"),
+    Input("income-table", "filter_query"),
+    State("income-table", "data"),
+    State("income-table", "data_previous"),
+    State("income-delta", "data"),
     prevent_initial_call=True
 )
-def modify_income_table(add_row_clicks, current_data, save_data_clicks):
-    ctx = dash.callback_context
-    if ctx.triggered_id == "add-income-row-button" and add_row_clicks:
-        new_table = add_row(current_data)
-    else:
-        new_table = current_data
-
-    if ctx.triggered_id == "save-income-button" and save_data_clicks:
-        pd.DataFrame(new_table, columns=visible_columns).to_csv(income_file_path, index=False, header=True)
-
-    return new_table
+def modify_income_table(add_row_clicks, data_timestamp, save_data_clicks, page_current, page_size, sort_by,
+                        filter_query, current_data, data_previous, unsaved_delta):
+    return modify_table('income', "add-income-row-button", "save-income-button", add_row_clicks, data_timestamp,
+                        save_data_clicks, page_current, page_size, sort_by, filter_query, current_data,
+                        data_previous, unsaved_delta)
 
 
 @app.callback(
     Output("expenses-table", "data"),
+    Output("expenses-table", "page_count"),
+    Output("expenses-delta", "data", allow_duplicate=True),
     Input("add-expense-row-button", "n_clicks"),
-    Input("expenses-table", "data"),
+    Input("expenses-table", "data_timestamp"),
     Input("save-expenses-button", "n_clicks"),
+    Input("expenses-table", "page_current"),
+    Input("expenses-table", "page_size"),
+    Input("expenses-table", "sort_by"),
+    Input("expenses-table", "filter_query"),
+    State("expenses-table", "data"),
+    State("expenses-table", "data_previous"),
+    State("expenses-delta", "data"),
     prevent_initial_call=True
 )
-def modify_expenses_table(add_row_clicks, current_data, save_data_clicks):
-    ctx = dash.callback_context
-    if ctx.triggered_id == "add-expense-row-button" and add_row_clicks:
-        new_table = add_row(current_data)
-    else:
-        new_table = current_data
-
-    if ctx.triggered_id == "save-expenses-button" and save_data_clicks:
-        pd.DataFrame(new_table, columns=visible_columns).to_csv(expenses_file_path, index=False, header=True)
+def modify_expenses_table(add_row_clicks, data_timestamp, save_data_clicks, page_current, page_size, sort_by,
+                          filter_query, current_data, data_previous, unsaved_delta):
+    return modify_table('expenses', "add-expense-row-button", "save-expenses-button", add_row_clicks,
+                        data_timestamp, save_data_clicks, page_current, page_size, sort_by, filter_query,
+                        current_data, data_previous, unsaved_delta)
 
-    return new_table
 
 @app.callback(
     Output("bills-table", "data"),
+    Output("bills-table", "page_count"),
+    Output("bills-delta", "data", allow_duplicate=True),
     Input("add-bill-row-button", "n_clicks"),
-    Input("bills-table", "data"),
+    Input("bills-table", "data_timestamp"),
     Input("save-bills-button", "n_clicks"),
+    Input("bills-table", "page_current"),
+    Input("bills-table", "page_size"),
+    Input("bills-table", "sort_by"),
+    Input("bills-table", "filter_query"),
+    State("bills-table", "data"),
+    State("bills-table", "data_previous"),
+    State("bills-delta", "data"),
     prevent_initial_call=True
 )
-def modify_bills_table(add_row_clicks, current_data, save_data_clicks):
-    ctx = dash.callback_context
-    if ctx.triggered_id == "add-bill-row-button" and add_row_clicks:
-        new_table = add_row(current_data)
-    else:
-        new_table = current_data
+def modify_bills_table(add_row_clicks, data_timestamp, save_data_clicks, page_current, page_size, sort_by,
+                       filter_query, current_data, data_previous, unsaved_delta):
+    return modify_table('bills', "add-bill-row-button", "save-bills-button", add_row_clicks, data_timestamp,
+                        save_data_clicks, page_current, page_size, sort_by, filter_query, current_data,
+                        data_previous, unsaved_delta)
 
-    if ctx.triggered_id == "save-bills-button" and save_data_clicks:
-        pd.DataFrame(new_table, columns=visible_columns).to_csv(bills_file_path, index=False, header=True)
 
-    return new_table
+# Saved totals of each table as (storage version, totals). Saves apply their delta here instead of re-reading the
+# table, and edits in the browser are added on top of them without touching storage.
+budget_totals = {}
+budget_totals_lock = threading.Lock()
 
+# Pie charts break income down by name and bills and expenses by category
+breakdown_columns = {'income': 'Name', 'bills': 'Category', 'expenses': 'Category'}
+
+
+def saved_totals(table):
+    version = storage.version(table)
+    with budget_totals_lock:
+        cached = budget_totals.get(table)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    amount, monthly, by = storage.totals(table, breakdown_columns[table])
+    totals = {'amount': amount, 'monthly': monthly, 'by': by}
+    with budget_totals_lock:
+        budget_totals[table] = (version, totals)
+    return totals
 
-def compute_summary():
-    # Calculate total income and total expenses per month
-    try:
-        income_df = pd.read_csv(income_file_path)
-    except FileNotFoundError:
-        income_df = pd.DataFrame(columns=visible_columns)
 
-    try:
-        expenses_df = pd.read_csv(expenses_file_path)
-    except FileNotFoundError:
-        expenses_df = pd.DataFrame(columns=visible_columns)
+def commit_totals(table, saved_version, delta):
+    with budget_totals_lock:
+        cached = budget_totals.get(table)
+        if cached is not None and cached[0] == saved_version:
+            budget_totals[table] = (storage.version(table), add_totals(cached[1], delta))
+        else:
+            budget_totals.pop(table, None)
 
-    try:
-        bills_df = pd.read_csv(bills_file_path)
-    except FileNotFoundError:
-        bills_df = pd.DataFrame(columns=visible_columns)
 
-    total_income = income_df['Amount'].sum()
+def live_totals(table, unsaved_delta=None):
+    # With unsaved edits the totals they apply to are already in memory, so the live update does no I/O
+    with budget_totals_lock:
+        cached = budget_totals.get(table)
+    totals = cached[1] if unsaved_delta and cached is not None else saved_totals(table)
+    return add_totals(totals, unsaved_delta)
 
-    expenses_df['MonthlyAmount'] = expenses_df['Amount'] * expenses_df['Frequency'].map(frequency_mapping)
 
-    total_expenses_per_month = expenses_df['MonthlyAmount'].sum().item()
+# The summary is derived from the three budget tables and only recomputed when one of them changes
+summary_cache = {}
+summary_lock = threading.Lock()
 
-    bills_df['MonthlyAmount'] = bills_df['Amount'] * bills_df['Frequency'].map(frequency_mapping)
+# summary.csv is kept as an export only; it is written in the background once edits settle
+summary_write_delay = 2.0
+summary_write_timer = None
 
-    total_bills_per_month = bills_df['MonthlyAmount'].sum()
+
+def persist_summary(summary_df):
+    # Renamed over summary.csv from a temporary file of its own, so readers never see a partial file and
+    # workers persisting at the same time never share one
+    summary_df = pd.DataFrame(summary_df, columns=['Category', 'Monthly Amount'])
+    write_atomic(summary_file_path, lambda tmp_path: summary_df.to_csv(tmp_path, index=False, header=True))
+
+
+def schedule_summary_write(summary_df):
+    global summary_write_timer
+    with summary_lock:
+        if summary_write_timer is not None:
+            summary_write_timer.cancel()
+        summary_write_timer = threading.Timer(summary_write_delay, persist_summary, args=(summary_df,))
+        summary_write_timer.daemon = True
+        summary_write_timer.start()
+
+
+def budget_version():
+    return tuple(storage.version(table) for table in budget_tables)
+
+
+def summary_frame(totals):
+    # Calculate total income and total expenses per month
+    total_income = totals['income']['amount']
+
+    total_expenses_per_month = totals['expenses']['monthly']
+
+    total_bills_per_month = totals['bills']['monthly']
 
     remaining_income = total_income - total_bills_per_month - total_expenses_per_month
 
     # Create a summary dataframe
-    summary_df = pd.DataFrame({
+    return pd.DataFrame({
         'Category': ['Total Income', 'Total Bills', 'Total Expenses', 'Remaining Income'],
         'Monthly Amount': [total_income, total_bills_per_month, total_expenses_per_month, remaining_income]
     })
 
-    pd.DataFrame(summary_df, columns=['Category', 'Monthly Amount']).to_csv(summary_file_path, index=False,
-                                                                                header=True)
 
-    return summary_df
+def compute_summary():
+    versions = budget_version()
+    with summary_lock:
+        if summary_cache.get('versions') == versions:
+            return summary_cache['summary_df'].copy()
+
+    summary_df = summary_frame({table: saved_totals(table) for table in budget_tables})
+
+    with summary_lock:
+        summary_cache.update(versions=versions, summary_df=summary_df)
+    schedule_summary_write(summary_df)
+
+    return summary_df.copy()
 
 
 @app.callback(
     Output("tabs-content", "children"),
+    Output("income-delta", "data"),
+    Output("bills-delta", "data"),
+    Output("expenses-delta", "data"),
     [Input("tabs", "active_tab")]
 )
 def update_tab_content(active_tab):
+    # Switching tabs rebuilds the tables from storage, so their unsaved edits are dropped
+    return tab_content(active_tab), None, None, None
+
+
+def tab_content(active_tab):
     if active_tab == "summary-tab":
 
         updated_summary_df = compute_summary()
@@ -205,132 +418,142 @@ def update_tab_content(active_tab):
         return [summary_table]
 
     elif active_tab == "income-tab":
-        try:
-            income_df = pd.read_csv(income_file_path)
-        except FileNotFoundError:
-            income_df = pd.DataFrame(columns=visible_columns)
-
         return [
-            create_table("income-table", income_df),
+            create_table("income-table", 'income'),
             html.Button('+', id='add-income-row-button', className='mt-3 custom-plus-button'),
             html.Button('Save', id='save-income-button', className='mt-3 custom-save-button')
         ]
 
     elif active_tab == "expenses-tab":
-        try:
-            expenses_df = pd.read_csv(expenses_file_path)
-        except FileNotFoundError:
-            expenses_df = pd.DataFrame(columns=visible_columns)
-
         return [
-            create_table("expenses-table", expenses_df),
+            create_table("expenses-table", 'expenses'),
             html.Button('+', id='add-expense-row-button', className='mt-3 custom-plus-button'),
             html.Button('Save', id='save-expenses-button', className='mt-3 custom-save-button')
         ]
 
     elif active_tab == "bills-tab":
-        try:
-            bills_df = pd.read_csv(bills_file_path)
-        except FileNotFoundError:
-            bills_df = pd.DataFrame(columns=visible_columns)
-
         return [
-            create_table("bills-table", bills_df),
+            create_table("bills-table", 'bills'),
             html.Button('+', id='add-bill-row-button', className='mt-3 custom-plus-button'),
-            html.Button('Save', id='save-bills-button', className='mt-3 custom-save-button')
+            html.Button('Save', id='save-bills-button', className='mt-3 custom-save-button'),
+            html.H5('Suggested Bills', className='mt-4'),
+            create_suggestions_table(),
+            html.Button('Add selected', id='add-suggested-bills-button', className='mt-3 custom-save-button')
         ]
     else:
         return html.Div("Invalid Tab")
 
 
+# Suggested bills are added as unsaved rows under this category, to be recategorised before saving
+suggested_bill_category = 'Recurring'
+
+
+def bill_suggestions():
+    # Recurring payments found in the offset statements that the bills table does not list yet
+    dataset = get_dataset()
+    if dataset is None or dataset.recurring_payments is None:
+        return []
+    names = {str(name).strip().lower() for name in budget_frame('bills')[1]['Name'].dropna()}
+    suggestions = dataset.recurring_payments
+    suggestions = suggestions[~suggestions['Name'].str.lower().isin(names)
+                              & suggestions['Frequency'].isin(list(frequency_mapping))]
+    return suggestions.to_dict('records')
+
+
+def create_suggestions_table():
+    return dash_table.DataTable(
+        id='bill-suggestions',
+        columns=[{'name': col, 'id': col} for col in recurring_columns],
+        data=bill_suggestions(),
+        row_selectable='multi',
+        selected_rows=[],
+        page_size=budget_page_size,
+        style_table={
+            'fontSize': '12px',
+            'backgroundColor': '#343a40',
+            'color': '#fff',
+            'border': '1px solid #495057',
+            'overflowX': 'auto',
+            'overflowY': 'auto',
+        },
+        style_cell = {
+            'backgroundColor': '#495057',
+            'color': '#fff',
+        },
+        style_header={
+            'backgroundColor': 'rgb(40, 40, 40)',
+            'fontWeight': 'bold',
+        }
+    )
+
+
+@app.callback(
+    Output("bills-table", "data", allow_duplicate=True),
+    Output("bills-delta", "data", allow_duplicate=True),
+    Output("bill-suggestions", "data"),
+    Output("bill-suggestions", "selected_rows"),
+    Input("add-suggested-bills-button", "n_clicks"),
+    State("bill-suggestions", "selected_rows"),
+    State("bill-suggestions", "data"),
+    State("bills-table", "data"),
+    State("bills-delta", "data"),
+    prevent_initial_call=True
+)
+def add_suggested_bills(n_clicks, selected_rows, suggestions, current_data, unsaved_delta):
+    # Selected suggestions become unsaved rows of the bills table; Save inserts them like rows added with '+'
+    if not n_clicks or not selected_rows:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+    selected = set(selected_rows)
+    rows = [{'Name': suggestion['Name'], 'Amount': suggestion['Amount'], 'Category': suggested_bill_category,
+             'Frequency': suggestion['Frequency']}
+            for position, suggestion in enumerate(suggestions) if position in selected]
+    remaining = [suggestion for position, suggestion in enumerate(suggestions) if position not in selected]
+    delta = add_totals(unsaved_delta or row_totals('bills', []), row_totals('bills', rows))
+    return (current_data or []) + rows, delta, remaining, []
+
+
+def pie_figure(title, labels, values):
+    return {
+        'data': [go.Pie(labels=labels, values=values)],
+        'layout': {
+            'title': title,
+            'legend': {'x': 1, 'y': 0.5},
+            'paper_bgcolor': '#495057',  # Dark background color for the entire graph
+            'font': {'color': '#fff'},  # White text color
+        },
+    }
+
+
+def breakdown_figure(title, totals):
+    keys = sorted(totals['by'])
+    return pie_figure(title, keys, [totals['by'][key][0] for key in keys])
+
+
 @app.callback(
     Output("pie-chart", "figure"),
-    [Input("tabs", "active_tab")]
+    [Input("tabs", "active_tab"),
+     Input("income-delta", "data"),
+     Input("bills-delta", "data"),
+     Input("expenses-delta", "data")]
 )
-def update_pie_chart(active_tab):
+def update_pie_chart(active_tab, income_delta=None, bills_delta=None, expenses_delta=None):
+    # Unsaved edits in the open table are drawn straight away from the running totals
     if active_tab == "summary-tab":
-        try:
-            summary_df = pd.read_csv(summary_file_path)
-        except FileNotFoundError:
-            summary_df = pd.DataFrame(columns=visible_columns)
-
-        pie_chart_figure = {
-            'data': [go.Pie(labels=summary_df['Category'].iloc[1:], values=summary_df['Monthly Amount'].iloc[1:])],
-            'layout': {
-                'title': 'Summary Breakdown',
-                'legend': {'x': 1, 'y': 0.5},
-                'paper_bgcolor': '#495057',  # Dark background color for the entire graph
-                'font': {'color': '#fff'},  # White text color
-            },
-        }
-
-        return pie_chart_figure
+        summary_df = summary_frame({'income': live_totals('income', income_delta),
+                                    'bills': live_totals('bills', bills_delta),
+                                    'expenses': live_totals('expenses', expenses_delta)})
+        return pie_figure('Summary Breakdown', summary_df['Category'].iloc[1:], summary_df['Monthly Amount'].iloc[1:])
 
     elif active_tab == "income-tab":
-        try:
-            income_df = pd.read_csv(income_file_path)
-        except FileNotFoundError:
-            income_df = pd.DataFrame(columns=visible_columns)
-
-        income_df['MonthlyAmount'] = income_df['Amount'] * income_df['Frequency'].map(frequency_mapping)
-
-        pie_chart_figure = {
-            'data': [go.Pie(labels=income_df['Name'], values=income_df['MonthlyAmount'])],
-            'layout': {
-                'title': 'Income Breakdown',
-                'legend': {'x': 1, 'y': 0.5},
-                'paper_bgcolor': '#495057',  # Dark background color for the entire graph
-                'font': {'color': '#fff'},  # White text color
-            },
-        }
-
-        return pie_chart_figure
+        return breakdown_figure('Income Breakdown', live_totals('income', income_delta))
 
     elif active_tab == "bills-tab":
-        try:
-            bills_df = pd.read_csv(bills_file_path)
-        except FileNotFoundError:
-            bills_df = pd.DataFrame(columns=visible_columns)
-
-        bills_df['MonthlyAmount'] = bills_df['Amount'] * bills_df['Frequency'].map(frequency_mapping)
-
-        # Group by category and sum the monthly amounts
-        bills_by_category = bills_df.groupby('Category')['MonthlyAmount'].sum()
-
-        pie_chart_figure = {
-            'data': [go.Pie(labels=bills_by_category.index, values=bills_by_category)],
-            'layout': {
-                'title': 'Bills Breakdown',
-                'legend': {'x': 1, 'y': 0.5},
-                'paper_bgcolor': '#495057',  # Dark background color for the entire graph
-                'font': {'color': '#fff'},  # White text color
-            },
-        }
-
-        return pie_chart_figure
+        # Monthly amounts summed per category
+        return breakdown_figure('Bills Breakdown', live_totals('bills', bills_delta))
 
     elif active_tab == "expenses-tab":
-        try:
-            expenses_df = pd.read_csv(expenses_file_path)
-        except FileNotFoundError:
-            expenses_df = pd.DataFrame(columns=visible_columns)
-
-        expenses_df['MonthlyAmount'] = expenses_df['Amount'] * expenses_df['Frequency'].map(frequency_mapping)
-
-        # Group by category and sum the monthly amounts
-        expenses_by_category = expenses_df.groupby('Category')['MonthlyAmount'].sum()
-
-        pie_chart_figure = {
-            'data': [go.Pie(labels=expenses_by_category.index, values=expenses_by_category)],
-            'layout': {
-                'title': 'Expenses Breakdown',
-                'legend': {'x': 1, 'y': 0.5},
-                'paper_bgcolor': '#495057',  # Dark background color for the entire graph
-                'font': {'color': '#fff'},  # White text color
-            },
-        }
-
-        return pie_chart_figure
+        # Monthly amounts summed per category
+        return breakdown_figure('Expenses Breakdown', live_totals('expenses', expenses_delta))
     else:
         # Return an empty figure or None when not on "expenses-tab"
         return {'data': [], 'layout': {}}
@@ -0,0 +1,49 @@
+import dash
+import numpy as np
+
+from callbacks.scenarios import parse_values, max_scenarios
+from etl.dataset import get_dataset
+from etl.offset_interest import reconcile_interest_saved, interest_saved_scenarios, divergence_tolerance
+
+
+def interest_dataset():
+    dataset = get_dataset()
+    if dataset is None:
+        return None, 'Waiting for statements...'
+    if dataset.statistics_index is None:
+        return None, 'Interest is not recalculated while statements are streamed'
+    if dataset.interest_periods is None:
+        return None, 'No loan interest charges found in the mortgage statements'
+    return dataset, None
+
+
+def update_reconciliation(monthly_version, offset_version, mortgage_version):
+    dataset, status = interest_dataset()
+    if dataset is None:
+        return [], status
+
+    reconciled = reconcile_interest_saved(dataset.statistics_index, dataset.interest_periods)
+    diverging = reconciled['Diverges'].to_numpy()
+    reported = reconciled['Interest Saved'].notna().sum()
+    status = (f'{diverging.sum()} of {reported} reported months differ from the interest saved on the daily offset '
+              f'balance by more than {divergence_tolerance:.0%}')
+    return reconciled.assign(Diverges=np.where(diverging, 'Yes', '')).to_dict('records'), status
+
+
+def update_interest_what_if(rate_changes, offset_changes, monthly_version, offset_version, mortgage_version):
+    dataset, status = interest_dataset()
+    if dataset is None:
+        return dash.no_update, status
+
+    values = [parse_values(text) for text in (rate_changes, offset_changes)]
+    if any(value is None for value in values):
+        return dash.no_update, 'Enter numbers separated by commas'
+    count = len(values[0]) * len(values[1])
+    if count > max_scenarios:
+        return dash.no_update, f'{count} scenarios is more than the limit of {max_scenarios}'
+
+    scenarios = interest_saved_scenarios(dataset.statistics_index, dataset.interest_periods, *values)
+    periods = dataset.interest_periods
+    status = (f'{count} scenarios over {len(periods.months)} statement months from {periods.months[0]}, '
+              f'at each month\'s charged rate moved by the rate change')
+    return scenarios.to_dict('records'), status
@@ -0,0 +1,51 @@
+import os
+import time
+
+import diskcache
+from dash import DiskcacheManager
+
+from etl.dataset import refresh_dataset, install_dataset, uses_shared_dataset
+from etl.statement_store import store_dir
+
+# Background callbacks run in a process of their own; their progress and results are passed through this cache
+background_dir = os.path.join(store_dir, 'background')
+# How long a refreshed dataset waits in the cache for the server process to install it
+handoff_seconds = 600
+
+_manager = None
+
+
+def background_manager():
+    global _manager
+    if _manager is None:
+        _manager = DiskcacheManager(diskcache.Cache(background_dir))
+    return _manager
+
+
+def dataset_key(version):
+    return f'dataset-{version}'
+
+
+def refresh_data(set_progress, n_clicks):
+    # Clicking "Refresh data" again or "Cancel" kills the running refresh. The statement store and the shared
+    # dataset are written atomically, so a killed refresh leaves them as they were or fully updated.
+    started = time.perf_counter()
+    finished = []
+
+    def on_stage(stage):
+        finished.append(stage)
+        set_progress(f'{stage} finished ({len(finished)} stages, {time.perf_counter() - started:.1f}s)')
+
+    set_progress('Reading statements')
+    dataset = refresh_dataset(on_stage)
+    if not uses_shared_dataset():
+        background_manager().handle.set(dataset_key(dataset.version), dataset, expire=handoff_seconds)
+    return dataset.version, f'Refreshed in {time.perf_counter() - started:.1f}s'
+
+
+def install_refreshed_dataset(version):
+    # Runs in the server process: the refreshed dataset is taken from the cache rather than built again. A shared
+    # dataset was published instead, and get_dataset maps it.
+    dataset = background_manager().handle.pop(dataset_key(version), None)
+    if dataset is not None:
+        install_dataset(dataset)
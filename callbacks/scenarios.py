@@ -0,0 +1,39 @@
+import dash
+
+from etl.dataset import get_dataset
+from etl.projections import projection_seed, project_scenarios
+from layouts.scenarios import scenario_figure, best_scenarios_count
+
+# Larger grids are refused so a single request can not hold up the server
+max_scenarios = 20000
+
+
+def parse_values(text):
+    try:
+        values = sorted({float(value) for value in (text or '').split(',') if value.strip()})
+    except ValueError:
+        return None
+    return values or [0.0]
+
+
+def update_scenarios(rate_changes, extra_repayments, offset_growth, lump_sums, monthly_version):
+    dataset = get_dataset()
+    if dataset is None or not len(dataset.monthly_df):
+        return dash.no_update, dash.no_update, 'Waiting for statements...'
+
+    values = [parse_values(text) for text in (rate_changes, extra_repayments, offset_growth, lump_sums)]
+    if any(value is None for value in values):
+        return dash.no_update, dash.no_update, 'Enter numbers separated by commas'
+    count = len(values[0]) * len(values[1]) * len(values[2]) * len(values[3])
+    if count > max_scenarios:
+        return dash.no_update, dash.no_update, f'{count} scenarios is more than the limit of {max_scenarios}'
+
+    seed = projection_seed(dataset.monthly_df)
+    scenarios = project_scenarios(seed, *values)
+    current = project_scenarios(seed, [0], [0], [0], [0]).iloc[0]
+
+    best = scenarios.sort_values(['Total Interest', 'Months'], kind='stable').head(best_scenarios_count)
+    status = (f'{count} scenarios from {seed["month"]}: balance ${seed["mortgage_balance"]:,.0f}, '
+              f'offset ${seed["offset_balance"]:,.0f}, repayment ${seed["repayment"]:,.0f}/month, '
+              f'rate {seed["rate"] * 100:.2f}%')
+    return scenario_figure(scenarios, current), best.to_dict('records'), status
@@ -0,0 +1,79 @@
+import dash
+
+from callbacks.refresh import install_refreshed_dataset
+from callbacks.table_paging import page_records
+
+from etl.dataset import get_dataset, warm_dataset
+from etl.statistics_index import period_statistics, range_totals
+from layouts.statistics_tables import interest_figure, loan_figure, net_loan_savings_figure
+
+
+# Poll quickly while the statements load, then only to notice reloads
+loading_poll_ms = 1000
+version_poll_ms = 5000
+
+
+def check_dataset_version(n_intervals, refreshed_version, monthly_version, total_version, offset_version,
+                          mortgage_version, poll_ms):
+    # Each store only changes when its frame did, so a reload re-renders just the charts and tables it affected
+    if 'refreshed-version.data' in dash.callback_context.triggered_prop_ids:
+        install_refreshed_dataset(refreshed_version)
+    dataset = get_dataset()
+    if dataset is None:
+        warm_dataset()
+        return [dash.no_update] * 5
+
+    def changed(new, old):
+        return new if new != old else dash.no_update
+
+    versions = dataset.frame_versions
+    return (
+        changed(versions['monthly_df'], monthly_version),
+        changed(versions['total_df'], total_version),
+        changed(versions['offset'], offset_version),
+        changed(versions['mortgage'], mortgage_version),
+        changed(version_poll_ms, poll_ms),
+    )
+
+
+def statistics_view(dataset, start_date, end_date, granularity):
+    # The whole period by month is the ETL's own monthly view; other ranges and periods come from the index
+    if dataset.statistics_index is None or (start_date is None and end_date is None and granularity == 'M'):
+        return dataset.monthly_df
+    return period_statistics(dataset.statistics_index, start_date, end_date, granularity)
+
+
+def populate_statistics(monthly_version, offset_version, mortgage_version, start_date, end_date, granularity):
+    dataset = get_dataset()
+    if dataset is None:
+        return [dash.no_update] * 3
+
+    monthly_df = statistics_view(dataset, start_date, end_date, granularity)
+
+    return (
+        interest_figure(monthly_df),
+        loan_figure(monthly_df),
+        net_loan_savings_figure(monthly_df),
+    )
+
+
+def page_statistics_table(table_id, frame_name, page_current, page_size, sort_by, filter_query):
+    dataset = get_dataset()
+    if dataset is None:
+        return [], 1
+    return page_records(table_id, dataset.frame_versions[frame_name], getattr(dataset, frame_name), page_current,
+                        page_size, sort_by, filter_query)
+
+
+def page_total_view(page_current, page_size, sort_by, total_version, offset_version, mortgage_version, start_date,
+                    end_date):
+    dataset = get_dataset()
+    if dataset is None or dataset.statistics_index is None or (start_date is None and end_date is None):
+        return page_statistics_table('total-view-table', 'total_df', page_current, page_size, sort_by, '')
+    return page_records('total-view-table', (dataset.version, start_date, end_date),
+                        range_totals(dataset.statistics_index, start_date, end_date), page_current, page_size, sort_by,
+                        '')
+
+
+def page_monthly_view(page_current, page_size, sort_by, filter_query, monthly_version):
+    return page_statistics_table('monthly-view-table', 'monthly_df', page_current, page_size, sort_by, filter_query)
@@ -0,0 +1,106 @@
+import math
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+# DataTable filter_query operators, longest first so '>=' is not read as '>'
+filter_operators = [
+    ['ge ', '>='],
+    ['le ', '<='],
+    ['lt ', '<'],
+    ['gt ', '>'],
+    ['ne ', '!='],
+    ['eq ', '='],
+    ['contains '],
+    ['datestartswith '],
+]
+
+# Filtered and sorted row orders keyed by (table, data version, filter, sort), most recently used last
+order_cache = OrderedDict()
+order_cache_size = 32
+order_cache_lock = Lock()
+
+
+def split_filter_part(filter_part):
+    # '{column} operator value'. The column is read first, so operator words inside a column name are left alone.
+    filter_part = filter_part.strip()
+    if not filter_part.startswith('{') or '}' not in filter_part:
+        return [None] * 3
+    name, operator_part = filter_part[1:].split('}', 1)
+    operator_part = operator_part.lstrip()
+
+    for operator_type in filter_operators:
+        for operator in operator_type:
+            if operator_part.startswith(operator):
+                value_part = operator_part[len(operator):].strip()
+                v0 = value_part[0] if value_part else ''
+                if v0 and v0 == value_part[-1] and v0 in ("'", '"', '`'):
+                    value = value_part[1: -1].replace('\\' + v0, v0)
+                elif operator_type[0] in ('contains ', 'datestartswith '):
+                    # Text matches keep the value as typed, so '2015' is not matched as '2015.0'
+                    value = value_part
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+
+                return name, operator_type[0].strip(), value
+
+    return [None] * 3
+
+
+def filter_mask(df, filter_query):
+    mask = pd.Series(True, index=df.index)
+    for filter_part in (filter_query or '').split(' && '):
+        col_name, operator, filter_value = split_filter_part(filter_part)
+        if col_name not in df.columns:
+            continue
+
+        column = df[col_name]
+        if operator in ('eq', 'ne', 'lt', 'le', 'gt', 'ge'):
+            if isinstance(filter_value, float):
+                column = pd.to_numeric(column, errors='coerce')
+            else:
+                column = column.astype(str)
+            mask &= getattr(column, operator)(filter_value).fillna(False).astype(bool)
+        elif operator == 'contains':
+            mask &= column.astype(str).str.contains(str(filter_value), case=False, regex=False)
+        elif operator == 'datestartswith':
+            mask &= column.astype(str).str.startswith(str(filter_value))
+    return mask
+
+
+def ordered_positions(df, filter_query, sort_by):
+    positions = np.flatnonzero(filter_mask(df, filter_query).to_numpy())
+    sort_by = [col for col in (sort_by or []) if col['column_id'] in df.columns]
+    if sort_by:
+        order = df.iloc[positions].reset_index(drop=True).sort_values(
+            [col['column_id'] for col in sort_by],
+            ascending=[col['direction'] == 'asc' for col in sort_by],
+            kind='stable',
+        ).index.to_numpy()
+        positions = positions[order]
+    return positions
+
+
+def page_records(table_id, version, df, page_current, page_size, sort_by, filter_query):
+    # Only the requested page crosses the wire; the filtered and sorted order is cached per data version
+    key = (table_id, version, filter_query or '', tuple((col['column_id'], col['direction']) for col in sort_by or []))
+    with order_cache_lock:
+        positions = order_cache.get(key)
+        if positions is not None:
+            order_cache.move_to_end(key)
+
+    if positions is None:
+        positions = ordered_positions(df, filter_query, sort_by)
+        with order_cache_lock:
+            order_cache[key] = positions
+            while len(order_cache) > order_cache_size:
+                order_cache.popitem(last=False)
+
+    start = (page_current or 0) * page_size
+    page = df.iloc[positions[start: start + page_size]]
+    return page.to_dict('records'), max(1, math.ceil(len(positions) / page_size))
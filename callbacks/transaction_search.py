@@ -0,0 +1,26 @@
+import math
+import time
+
+import dash
+
+from etl.dataset import get_dataset
+from etl.transaction_search import search_positions, search_records
+
+
+def search_transactions(query, start_date, end_date, min_amount, max_amount, page_current, page_size,
+                        offset_version, mortgage_version, monthly_version):
+    dataset = get_dataset()
+    if dataset is None:
+        return [], 1, 0, 'Waiting for statements...'
+    if dataset.search_index is None:
+        return [], 1, 0, 'Transactions are not kept in memory while statements are streamed'
+
+    started = time.perf_counter()
+    positions = search_positions(dataset.search_index, query, start_date, end_date, min_amount, max_amount)
+    # A new search starts again from its first page
+    if 'search-table.page_current' not in dash.callback_context.triggered_prop_ids:
+        page_current = 0
+    start = (page_current or 0) * page_size
+    records = search_records(dataset.search_index, positions[start: start + page_size])
+    status = f'{len(positions):,} transactions in {(time.perf_counter() - started) * 1000:.0f} ms'
+    return records, max(1, math.ceil(len(positions) / page_size)), page_current, status
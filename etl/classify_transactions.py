@@ -0,0 +1,86 @@
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+
+other_type = 'other'
+
+# Rules are (txn_type, pattern) pairs matched case-insensitively against descriptions. Each account classifies
+# with its statement adapter's rules followed by these, which apply to every account. Every rule is folded into a
+# single compiled alternation, so adding a rule does not add another pass over the description column.
+# Types are exclusive: a description matching several rules takes the type of the first of them in rule order,
+# wherever in the description each one matches.
+transaction_rules = []
+
+amount_pattern = re.compile(r'\$([\d,]+\.\d{2})')
+# Bumped when the same rules would classify differently, so stored rows are classified again
+classification_revision = 2
+
+_compiled = {}
+
+
+def register_transaction_rule(txn_type, pattern):
+    if not txn_type.isidentifier() or txn_type == other_type:
+        raise ValueError(f"Invalid transaction type '{txn_type}'")
+    transaction_rules.append((txn_type, pattern))
+
+
+def transaction_types(rules):
+    return list(dict.fromkeys(txn_type for txn_type, _ in rules)) + [other_type]
+
+
+def classifier_version(rules):
+    rules = repr((list(rules), amount_pattern.pattern, classification_revision)).encode()
+    return hashlib.sha256(rules).hexdigest()[:16]
+
+
+def combined_pattern(rules):
+    # The alternation of every rule, and each rule's own pattern for settling which of them comes first
+    key = tuple(rules)
+    if key not in _compiled:
+        # Rules sharing a txn_type get numbered group names; the group name after '__' is the rule's position
+        alternatives = [f'(?P<{txn_type}__{i}>{pattern})' for i, (txn_type, pattern) in enumerate(rules)]
+        _compiled[key] = (re.compile('|'.join(alternatives), re.IGNORECASE) if alternatives else None,
+                          [re.compile(pattern, re.IGNORECASE) for _, pattern in rules])
+    return _compiled[key]
+
+
+def first_rule(description, pattern, rule_patterns):
+    # The alternation takes the leftmost match, so any earlier rule that also matches further along wins instead
+    match = pattern.search(description) if pattern else None
+    if match is None:
+        return None
+    matched = int(match.lastgroup.rsplit('__', 1)[1])
+    return next((i for i in range(matched) if rule_patterns[i].search(description)), matched)
+
+
+def classify_descriptions(descriptions, rules):
+    # Descriptions repeat heavily, so each distinct description is matched once and the result broadcast back
+    codes, uniques = pd.factorize(descriptions)
+    pattern, rule_patterns = combined_pattern(rules)
+    types = transaction_types(rules)
+    type_codes = {txn_type: i for i, txn_type in enumerate(types)}
+    rule_codes = [type_codes[txn_type] for txn_type, _ in rules]
+
+    unique_types = np.empty(len(uniques) + 1, dtype=np.int8)
+    unique_amounts = np.empty(len(uniques) + 1, dtype=np.float64)
+    for i, description in enumerate(uniques):
+        rule = first_rule(description, pattern, rule_patterns)
+        unique_types[i] = type_codes[other_type] if rule is None else rule_codes[rule]
+        amount = amount_pattern.search(description)
+        unique_amounts[i] = float(amount.group(1).replace(',', '')) if amount else np.nan
+
+    # Missing descriptions are factorized to -1, which picks the trailing 'other'/NaN slot
+    unique_types[-1] = type_codes[other_type]
+    unique_amounts[-1] = np.nan
+
+    txn_type = pd.Categorical.from_codes(unique_types[codes], categories=types)
+    return txn_type, unique_amounts[codes]
+
+
+def classify_statements(df, rules):
+    txn_type, amount_in_description = classify_descriptions(df['description'], rules)
+    df['txn_type'] = txn_type
+    df['amount_in_description'] = amount_in_description
+    return df
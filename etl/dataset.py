@@ -0,0 +1,211 @@
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+from credentials import startDate
+
+from etl.offset_interest import build_interest_periods, interest_periods_arrays, interest_periods_from_arrays
+from etl.process_statements import process_offset_mortgage_statistics, stream_offset_mortgage_statistics, \
+    streaming, accounts, accounts_version, statement_format
+from etl.recurring_payments import detect_recurring_payments
+from etl.shared_dataset import source_fingerprint, publish_lock, read_current, publish_frames, map_frames, \
+    map_arrays, read_metadata
+from etl.statement_watcher import watch_statements
+from etl.statistics_index import build_statistics_index, statistics_index_arrays, statistics_index_from_arrays
+from etl.transaction_search import build_search_index, search_index_arrays, search_index_from_arrays
+from metrics import stage_listeners
+
+logger = logging.getLogger(__name__)
+
+frame_names = ('offset', 'mortgage', 'monthly_df', 'total_df')
+# Built from the frames once per dataset. A shared dataset publishes them next to its frames, so workers map
+# them instead of building their own.
+index_names = ('search_index', 'statistics_index', 'interest_periods')
+
+
+@dataclass(frozen=True)
+class Dataset:
+    offset: pd.DataFrame
+    mortgage: pd.DataFrame
+    monthly_df: pd.DataFrame
+    total_df: pd.DataFrame
+    version: str = None
+    # Content hash of each frame, so views can skip re-rendering when a reload left their frame unchanged
+    frame_versions: dict = None
+    # Description index over the offset and mortgage transactions, None when only the statistics were loaded
+    search_index: object = None
+    # Daily cumulative loan statistics for custom date ranges and periods, None under the same condition
+    statistics_index: object = None
+    # Statement periods of the loan's interest charges, for reconciling the bank's interest saved figures
+    interest_periods: object = None
+    # Payees debited from the offset account at a regular bill frequency, suggested for the bills table
+    recurring_payments: pd.DataFrame = None
+
+
+_dataset = None
+_lock = threading.Lock()
+_warm_thread = None
+_watcher = None
+
+# With several worker processes the dataset is built once and memory-mapped by every worker
+_shared = False
+
+
+def use_shared_dataset():
+    global _shared
+    _shared = True
+
+
+def uses_shared_dataset():
+    return _shared
+
+
+def frame_version(df):
+    if df is None:
+        return None
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()[:16]
+
+
+def make_dataset(frames, version):
+    statistics_index = build_statistics_index(frames['offset'], frames['mortgage'])
+    return Dataset(**frames, version=version,
+                   frame_versions={name: frame_version(df) for name, df in frames.items()},
+                   search_index=build_search_index((frames['offset'], frames['mortgage'])),
+                   statistics_index=statistics_index,
+                   interest_periods=build_interest_periods(statistics_index, frames['mortgage']),
+                   recurring_payments=detect_recurring_payments(frames['offset']))
+
+
+def publish_dataset(dataset, fingerprint):
+    frames = {name: getattr(dataset, name) for name in frame_names + ('recurring_payments',)}
+    arrays = {
+        'search_index': search_index_arrays(dataset.search_index),
+        'statistics_index': statistics_index_arrays(dataset.statistics_index),
+        'interest_periods': interest_periods_arrays(dataset.interest_periods),
+    }
+    return publish_frames(frames, fingerprint, arrays, {'frame_versions': dataset.frame_versions})
+
+
+def compute_dataset():
+    if streaming:
+        # The streaming loaders never hold the transaction frames, so only the statistics are available
+        monthly_df, total_df = stream_offset_mortgage_statistics()
+        frames = dict(offset=None, mortgage=None, monthly_df=monthly_df, total_df=total_df)
+    else:
+        frames = dict(zip(frame_names, process_offset_mortgage_statistics()))
+    return make_dataset(frames, f'{time.time_ns():x}')
+
+
+def map_dataset(version):
+    # Everything was built by the worker that published the version, so mapping it builds nothing
+    frames = map_frames(version, frame_names + ('recurring_payments',))
+    arrays = map_arrays(version, index_names)
+    statements = (frames['offset'], frames['mortgage'])
+    return Dataset(**frames, version=version, frame_versions=read_metadata(version)['frame_versions'],
+                   search_index=search_index_from_arrays(arrays['search_index'], statements),
+                   statistics_index=statistics_index_from_arrays(arrays['statistics_index']),
+                   interest_periods=interest_periods_from_arrays(arrays['interest_periods']))
+
+
+def build_shared_dataset(force=False):
+    fingerprint = source_fingerprint([account.pattern for account in accounts], startDate, accounts_version(),
+                                     streaming, statement_format)
+    with publish_lock():
+        current = read_current()
+        if force or current is None or current['fingerprint'] != fingerprint:
+            version = publish_dataset(compute_dataset(), fingerprint)
+        else:
+            version = current['version']
+    return map_dataset(version)
+
+
+def build_dataset(force=False):
+    return build_shared_dataset(force) if _shared else compute_dataset()
+
+
+def get_dataset():
+    # Returns None until the ETL has finished; callers render placeholders in the meantime
+    global _dataset
+    if _shared and _dataset is not None:
+        current = read_current()
+        if current is not None and current['version'] != _dataset.version:
+            with _lock:
+                if current['version'] != _dataset.version:
+                    _dataset = map_dataset(current['version'])
+    return _dataset
+
+
+def load_dataset():
+    global _dataset
+    with _lock:
+        if _dataset is None:
+            _dataset = build_dataset()
+    return _dataset
+
+
+def reload_dataset():
+    # The statement store re-ingests only new or changed files; readers keep the previous snapshot until the
+    # finished one is swapped in
+    global _dataset
+    with _lock:
+        previous = _dataset
+        _dataset = build_dataset()
+    previous_versions = previous.frame_versions if previous is not None else {}
+    changed = [name for name in frame_names if _dataset.frame_versions[name] != previous_versions.get(name)]
+    logger.info('Reloaded statements as version %s, changed: %s', _dataset.version, ', '.join(changed) or 'none')
+    return _dataset
+
+
+def refresh_dataset(on_stage=None):
+    # Builds a new dataset for an explicit refresh, calling `on_stage` with each ETL stage as it finishes. Runs in
+    # a background callback's process, so the result still has to be installed in the server process; a shared
+    # dataset is published and picked up by every worker instead.
+    if on_stage is not None:
+        stage_listeners.append(on_stage)
+    try:
+        return build_dataset(force=True)
+    finally:
+        if on_stage is not None:
+            stage_listeners.remove(on_stage)
+
+
+def install_dataset(dataset):
+    # Versions are build times, so a dataset reloaded since the refresh started is kept
+    global _dataset
+    with _lock:
+        if _dataset is None or int(dataset.version, 16) > int(_dataset.version, 16):
+            _dataset = dataset
+    return _dataset
+
+
+def _reload():
+    try:
+        reload_dataset()
+    except Exception:
+        logger.exception('Reloading statements failed')
+
+
+def watch_dataset():
+    # Statement files dropped into the data directory are picked up without restarting the server
+    global _watcher
+    with _lock:
+        if _watcher is None:
+            _watcher = watch_statements([account.pattern for account in accounts], _reload)
+
+
+def _warm():
+    try:
+        load_dataset()
+    except Exception:
+        logger.exception('Loading statements failed')
+
+
+def warm_dataset():
+    global _warm_thread
+    with _lock:
+        if _dataset is None and (_warm_thread is None or not _warm_thread.is_alive()):
+            _warm_thread = threading.Thread(target=_warm, name='dataset-warmup', daemon=True)
+            _warm_thread.start()
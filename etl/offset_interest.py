@@ -0,0 +1,151 @@
+from dataclasses import dataclass, fields
+
+import numpy as np
+import pandas as pd
+
+from etl.statistics_index import day_numbers
+
+# Interest accrues daily on the closing balance at the annual rate over this many days
+day_count = 365
+# A bank figure diverges when it is off the calculated one by more than this fraction, and by more than min_divergence
+divergence_tolerance = 0.05
+min_divergence = 500
+
+reconciliation_columns = ['Month', 'Days', 'Average Loan Balance', 'Average Offset Balance', 'Rate',
+                          'Interest Charged', 'Interest Saved', 'Calculated Interest Saved', 'Difference',
+                          'Diverges']
+what_if_columns = ['Rate Change', 'Offset Change', 'Interest Charged', 'Interest Saved', 'Saved vs Bank']
+
+
+@dataclass(frozen=True)
+class InterestPeriods:
+    # Statement periods as day positions [starts, ends] of a StatisticsIndex. Each runs from the day of one interest
+    # charge to the day before the next, so the closing balance after a charge accrues towards the following one.
+    # Amounts are in cents; scraped is NaN where no interest saved figure was found, and rates are the annual rates
+    # implied by each charge.
+    months: np.ndarray
+    starts: np.ndarray
+    ends: np.ndarray
+    charged: np.ndarray
+    scraped: np.ndarray
+    rates: np.ndarray
+
+
+def interest_periods_arrays(periods):
+    # The periods as named arrays, for publishing next to a shared dataset's frames
+    return None if periods is None else {field.name: getattr(periods, field.name) for field in fields(periods)}
+
+
+def interest_periods_from_arrays(arrays):
+    return None if arrays is None else InterestPeriods(**{field.name: arrays[field.name]
+                                                          for field in fields(InterestPeriods)})
+
+
+def daily_balances(index, offset_changes=0.0):
+    # The loan owed each day, and the offset balance counted against it for each offset change: never below zero
+    # and never more than the loan
+    loan = np.maximum(np.nan_to_num(-index.mortgage_balance), 0)
+    offset = np.nan_to_num(index.offset_balance) + np.atleast_1d(np.asarray(offset_changes, dtype=float))[:, None]
+    return loan, np.clip(offset, 0, loan)
+
+
+def period_sums(values, starts, ends):
+    # Sums of each row of `values` over the day ranges [starts, ends]
+    cumulative = np.concatenate([np.zeros((len(values), 1)), np.cumsum(values, axis=1)], axis=1)
+    return cumulative[:, ends + 1] - cumulative[:, starts]
+
+
+def build_interest_periods(index, mortgage):
+    # Built with the dataset; None when the statistics index is not or the loan has no interest charges
+    if index is None:
+        return None
+    days = day_numbers(mortgage['transactionDate']) - index.first_day
+    is_interest = mortgage['txn_type'].astype(object).to_numpy() == 'interest'
+    if not is_interest.any():
+        return None
+
+    charge_days, charge = np.unique(days[is_interest], return_inverse=True)
+    charged = np.abs(np.bincount(charge, weights=mortgage['credit'].to_numpy(dtype=float, na_value=0)[is_interest],
+                                 minlength=len(charge_days)))
+    starts, ends = np.concatenate([[0], charge_days[:-1]]), charge_days - 1
+
+    # Each figure belongs to the first charge on or after the day it appears
+    scraped_values = mortgage['amount_in_description'].to_numpy(dtype=float, na_value=np.nan)
+    has_figure = ~np.isnan(scraped_values)
+    period = np.searchsorted(charge_days, days[has_figure])
+    in_period = period < len(charge_days)
+    scraped = np.bincount(period[in_period], weights=scraped_values[has_figure][in_period], minlength=len(charge_days))
+    figures = np.bincount(period[in_period], minlength=len(charge_days))
+    scraped = np.where(figures > 0, scraped, np.nan)
+
+    # Periods before the first loan balance have nothing to accrue on
+    kept = (ends >= starts) & ~np.isnan(index.mortgage_balance[starts])
+    starts, ends, charged, scraped = starts[kept], ends[kept], charged[kept], scraped[kept]
+    loan, offset = daily_balances(index)
+    net_days = period_sums(loan - offset, starts, ends)[0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.where(net_days > 0, charged * day_count / net_days, np.nan)
+    # With the whole loan offset nothing is charged to imply a rate from, so the nearest earlier one is kept
+    rates = pd.Series(rates).ffill().bfill().fillna(0.0).to_numpy()
+
+    months = np.datetime_as_string((index.first_day + charge_days[kept]).astype('datetime64[D]'), unit='M')
+    return InterestPeriods(months=months, starts=starts, ends=ends, charged=charged, scraped=scraped, rates=rates)
+
+
+def accrued_interest(index, periods, rate_changes=0.0, offset_changes=0.0):
+    # Interest charged and saved over each period for every candidate, as (candidates, periods) arrays in cents.
+    # A candidate's rate is each period's implied rate moved by its rate change (a fraction); candidates are the
+    # broadcast of the two arguments. Interest is linear in the rate, so only distinct offset changes go through the
+    # daily series and the rates just scale their balance-day sums.
+    rate_changes, offset_changes = np.broadcast_arrays(np.atleast_1d(np.asarray(rate_changes, dtype=float)),
+                                                       np.atleast_1d(np.asarray(offset_changes, dtype=float)))
+    changes, which = np.unique(offset_changes, return_inverse=True)
+    loan, offset = daily_balances(index, changes)
+    offset_days = period_sums(offset, periods.starts, periods.ends)[which]
+    loan_days = period_sums(loan[None, :], periods.starts, periods.ends)
+    daily_rates = np.maximum(periods.rates + rate_changes[:, None], 0) / day_count
+    return (loan_days - offset_days) * daily_rates, offset_days * daily_rates
+
+
+def reconcile_interest_saved(index, periods):
+    # The bank's interest saved figures against the interest the offset balance saved at the rate each charge
+    # implies, newest first and in dollars
+    if periods is None:
+        return pd.DataFrame(columns=reconciliation_columns)
+    _, saved = accrued_interest(index, periods)
+    loan, offset = daily_balances(index)
+    days = periods.ends - periods.starts + 1
+    difference = periods.scraped - saved[0]
+    diverges = (np.abs(difference) > np.maximum(divergence_tolerance * np.abs(saved[0]), min_divergence))
+    result_df = pd.DataFrame({
+        'Month': periods.months,
+        'Days': days,
+        'Average Loan Balance': (period_sums(loan[None, :], periods.starts, periods.ends)[0] / days / 100).round(0),
+        'Average Offset Balance': (period_sums(offset, periods.starts, periods.ends)[0] / days / 100).round(0),
+        'Rate': (periods.rates * 100).round(2),
+        'Interest Charged': (periods.charged / 100).round(2),
+        'Interest Saved': (periods.scraped / 100).round(2),
+        'Calculated Interest Saved': (saved[0] / 100).round(2),
+        'Difference': (difference / 100).round(2) + 0.0,
+        # Months without a bank figure have nothing to diverge from
+        'Diverges': diverges & ~np.isnan(periods.scraped),
+    }, columns=reconciliation_columns)
+    return result_df[::-1].reset_index(drop=True)
+
+
+def interest_saved_scenarios(index, periods, rate_changes, offset_changes):
+    # Interest over the whole history for every combination of a rate change (% points) and an offset balance
+    # change (dollars), against what the bank reported saved
+    rate_changes, offset_changes = [values.ravel() for values in np.meshgrid(
+        np.asarray(rate_changes, dtype=float), np.asarray(offset_changes, dtype=float), indexing='ij')]
+    if periods is None:
+        return pd.DataFrame(columns=what_if_columns)
+    charged, saved = accrued_interest(index, periods, rate_changes / 100, offset_changes * 100)
+    bank_saved = np.nansum(periods.scraped)
+    return pd.DataFrame({
+        'Rate Change': rate_changes,
+        'Offset Change': offset_changes,
+        'Interest Charged': (charged.sum(axis=1) / 100).round(0),
+        'Interest Saved': (saved.sum(axis=1) / 100).round(0),
+        'Saved vs Bank': ((saved.sum(axis=1) - bank_saved) / 100).round(0),
+    }, columns=what_if_columns)
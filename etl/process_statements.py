@@ -1,76 +1,309 @@
+import logging
+import os
+import resource
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import astuple
+from functools import partial
+
+import numpy as np
 import pandas as pd
-from glob import glob
-from credentials import accountNumber, startDate
+from pandas.api.types import union_categoricals
+from credentials import startDate
+from etl.classify_transactions import classify_statements, classifier_version
+from etl.statement_adapters import account_kinds, configured_accounts, account_adapter, account_rules, adapter_version
+from etl.statement_parser import read_statements, iter_statement_chunks
+from etl.statement_store import sync_statements, sync_rollup, statement_files, file_stamp, record_date_ranges
+from metrics import etl_stage, input_rows, record_bytes_read, etl_rows
 
+logger = logging.getLogger(__name__)
 
-def process_offset_statements():
-    csv_files = 'data/offset*'
-    file_paths = glob(csv_files)
-    dfs = []
 
-    for csv_file in file_paths:
-        df = pd.read_csv(csv_file)
-        dfs.append(df)
+# Offset and mortgage accounts, each read with its bank's statement adapter; see etl/statement_adapters.py
+accounts = configured_accounts()
 
-    final_df = pd.concat(dfs, ignore_index=True)
+statement_columns = ['account', 'transactionDate', 'month', 'description', 'credit', 'balance', 'txn_type',
+                     'amount_in_description']
+money_columns = ['credit', 'balance', 'amount_in_description']
+# Only mortgage statements carry figures in their descriptions, so offset frames leave that column out
+account_columns = {
+    'offset': [col for col in statement_columns if col != 'amount_in_description'],
+    'mortgage': statement_columns,
+}
+# Bumped when the columns of ingested statements or rollups change, so stored rollups and published datasets
+# built with the old columns are rebuilt
+statement_format = 3
 
-    header = ['transactionDate', 'processedDate', 'description', 'a', 'credit', 'balance']
-    final_df.columns = header
+# Streaming mode folds statements into the monthly aggregates chunk by chunk instead of loading them whole
+streaming = os.environ.get('FINANCE_TRACKER_STREAMING') == '1'
+stream_chunk_size = int(os.environ.get('FINANCE_TRACKER_CHUNK_BYTES', 1 << 20))
 
-    final_df['transactionDate'] = pd.to_datetime(final_df['transactionDate'], format='%d %b %Y')
 
-    final_df['transactionDate'] = final_df['transactionDate'].dt.strftime('%Y-%m-%d')
+def month_ordinals(dates):
+    # Months since 1970-01, the numbering pandas uses for monthly Periods
+    return dates.to_numpy(dtype='datetime64[ns]').astype('datetime64[M]').astype(np.int32)
 
-    final_df['transactionDate'] = pd.to_datetime(final_df['transactionDate'])
 
-    final_df['month'] = final_df['transactionDate'].dt.to_period('M')
+def month_labels(ordinals):
+    return np.datetime_as_string(np.asarray(ordinals, dtype=np.int64).astype('datetime64[M]'), unit='M')
 
-    filtered_df = final_df[final_df['transactionDate'] > f'{startDate}'].reset_index()
 
-    return filtered_df[['transactionDate', 'month', 'description', 'credit', 'balance']].dropna()
+def to_cents(amounts):
+    amounts = amounts.to_numpy(dtype=float, na_value=np.nan)
+    missing = np.isnan(amounts)
+    cents = np.round(np.where(missing, 0, amounts) * 100).astype(np.int64)
+    # Only columns with missing amounts pay for the nullable mask
+    return pd.arrays.IntegerArray(cents, missing) if missing.any() else cents
 
 
-def process_mortgage_statements():
-    csv_files = 'data/mortgage*'
-    file_paths = glob(csv_files)
-    dfs = []
+def to_dollars(cents):
+    return cents.astype(float) / 100
 
-    for csv_file in file_paths:
-        df = pd.read_csv(csv_file)
-        dfs.append(df)
 
-    final_df = pd.concat(dfs, ignore_index=True)
+def filter_statements(final_df, columns=statement_columns):
+    # Ingested transactions keep money as integer cents so sums are exact, months as int32 ordinals and
+    # descriptions, which repeat heavily, as categoricals
+    filtered_df = final_df.loc[final_df['transactionDate'] > f'{startDate}',
+                               [col for col in columns if col != 'month']].reset_index(drop=True)
+    filtered_df['month'] = month_ordinals(filtered_df['transactionDate'])
+    for col in money_columns:
+        if col in filtered_df:
+            filtered_df[col] = to_cents(filtered_df[col])
+    if not isinstance(filtered_df['description'].dtype, pd.CategoricalDtype):
+        filtered_df['description'] = pd.Categorical.from_codes(*pd.factorize(filtered_df['description']))
 
-    header = ['transactionDate', 'processedDate', 'description', 'a', 'credit', 'balance']
-    final_df.columns = header
+    return filtered_df[columns]
 
-    final_df['transactionDate'] = pd.to_datetime(final_df['transactionDate'], format='%d %b %Y')
 
-    final_df['transactionDate'] = final_df['transactionDate'].dt.strftime('%Y-%m-%d')
+def account_version(account):
+    # Changes whenever the account's statements would be parsed or classified differently
+    return f'{adapter_version(account_adapter(account))}|{classifier_version(account_rules(account))}'
 
-    final_df['transactionDate'] = pd.to_datetime(final_df['transactionDate'])
 
-    final_df['month'] = final_df['transactionDate'].dt.to_period('M')
+def accounts_version():
+    return [(astuple(account), account_version(account)) for account in accounts]
 
-    filtered_df = final_df[final_df['transactionDate'] > f'{startDate}'].reset_index()
 
-    return filtered_df[['transactionDate', 'month', 'description', 'credit', 'balance']]
+@etl_stage('sync_account_statements', count_rows=lambda args, result: len(result[0]))
+def sync_account_statements(account):
+    # The account's statements and the digest of each file they were read from
+    adapter = account_adapter(account)
+    rules = account_rules(account)
+    final_df, changed, digests = sync_statements(account.name, account.pattern,
+                                                 partial(read_statements, adapter=adapter),
+                                                 partial(classify_statements, rules=rules), classifier_version(rules),
+                                                 adapter_version(adapter))
+    record_bytes_read('sync_account_statements', changed)
+    final_df['account'] = pd.Categorical.from_codes(np.zeros(len(final_df), dtype=np.int8), [account.name])
+    return final_df, digests
 
 
+def parallel_accounts(func, kinds=account_kinds):
+    # Accounts are ingested in parallel threads; Arrow parsing and Parquet reads and writes release the GIL
+    selected = [account for account in accounts if account.kind in kinds]
+    with ThreadPoolExecutor(max_workers=len(selected)) as pool:
+        return dict(zip(selected, pool.map(func, selected)))
+
+
+def merge_statements(frames):
+    # One frame in the normalized schema for all accounts of a kind
+    if len(frames) == 1:
+        return frames[0]
+    final_df = pd.concat(frames, ignore_index=True)
+    for col in ('account', 'txn_type'):
+        final_df[col] = union_categoricals([df[col] for df in frames])
+    return final_df
+
+
+def sync_kind_statements(kind):
+    return merge_statements([final_df for final_df, _ in parallel_accounts(sync_account_statements, [kind]).values()])
+
+
+def sync_offset_statements():
+    return sync_kind_statements('offset')
+
+
+def sync_mortgage_statements():
+    return sync_kind_statements('mortgage')
+
+
+@etl_stage('process_offset_statements')
+def process_offset_statements(final_df=None):
+    if final_df is None:
+        final_df = sync_offset_statements()
+
+    return filter_statements(final_df, account_columns['offset']).dropna(subset=['description', 'credit', 'balance'])
+
+
+@etl_stage('process_mortgage_statements')
+def process_mortgage_statements(final_df=None):
+    if final_df is None:
+        final_df = sync_mortgage_statements()
+
+    return filter_statements(final_df)
+
+
+no_months = pd.Series(dtype='Int64', index=pd.Index([], dtype=np.int32, name='month'))
+
+
+def offset_aggregates(offset):
+    return {'offset_balance': offset.groupby(['account', 'month'], observed=True)['balance'].last()}
+
+
+def mortgage_aggregates(mortgage):
+    credit_by_type = mortgage.groupby(['month', 'txn_type'], observed=True)['credit'].sum().unstack()
+    interest_saved = mortgage.loc[mortgage['amount_in_description'].notna(), ['month', 'amount_in_description']]
+
+    return {
+        'mortgage_balance': mortgage.groupby(['account', 'month'], observed=True)['balance'].last(),
+        'repayment': credit_by_type.get('repayment', no_months).dropna(),
+        'interest': credit_by_type.get('interest', no_months).dropna(),
+        'interest_saved': interest_saved.rename(columns={'amount_in_description': 'interest_saved'}),
+    }
+
+
+def fold_aggregates(aggregates, chunk_aggregates):
+    # Chunks arrive in statement order, so a later chunk's month-end balance replaces an earlier one
+    folded = dict(aggregates)
+    for key, value in chunk_aggregates.items():
+        if key not in folded:
+            folded[key] = value
+        elif key in ('offset_balance', 'mortgage_balance'):
+            folded[key] = value.combine_first(folded[key])
+        elif key == 'interest_saved':
+            folded[key] = pd.concat([folded[key], value], ignore_index=True)
+        else:
+            folded[key] = folded[key].add(value, fill_value=0)
+    return folded
+
+
+def chunk_date_range(chunk, entry, stamp):
+    # Widens a streamed file's manifest entry by the dates in one of its chunks
+    dates = chunk['transactionDate'].dropna()
+    if not len(dates):
+        return entry
+    first_date, last_date = dates.min().isoformat(), dates.max().isoformat()
+    if entry is not None:
+        first_date, last_date = min(first_date, entry['first_date']), max(last_date, entry['last_date'])
+    return dict(stamp, first_date=first_date, last_date=last_date)
+
+
+@etl_stage('stream_offset_mortgage_statistics', count_rows=None)
+def stream_offset_mortgage_statistics(chunk_size=stream_chunk_size):
+    aggregates = {}
+
+    for account in accounts:
+        aggregate = offset_aggregates if account.kind == 'offset' else mortgage_aggregates
+        rules = account_rules(account)
+        csv_files = statement_files(account.name, account.pattern, startDate)
+        record_bytes_read('stream_offset_mortgage_statistics', csv_files)
+        # Each file's dates are recorded as it streams, so later runs skip files wholly before startDate
+        date_ranges = {}
+        for csv_file in csv_files:
+            stamp = file_stamp(csv_file)
+            for chunk in iter_statement_chunks([csv_file], chunk_size, account_adapter(account)):
+                etl_rows.labels('stream_offset_mortgage_statistics').inc(len(chunk))
+                date_ranges[csv_file] = chunk_date_range(chunk, date_ranges.get(csv_file), stamp)
+                chunk = filter_statements(classify_statements(chunk.assign(account=account.name), rules),
+                                          account_columns[account.kind])
+                if account.kind == 'offset':
+                    chunk = chunk.dropna(subset=['description', 'credit', 'balance'])
+                if len(chunk):
+                    aggregates = fold_aggregates(aggregates, aggregate(chunk))
+        record_date_ranges(account.name, {path: entry for path, entry in date_ranges.items() if entry is not None})
+
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    logger.info('Streamed statements in %d byte chunks, peak RSS %.1f MB', chunk_size, peak_rss_mb)
+
+    return statistics_from_aggregates(aggregates)
+
+
+rollup_keys = ['source', 'month']
+
+
+@etl_stage('offset_rollup', count_rows=input_rows)
+def offset_rollup(statements):
+    offset = filter_statements(statements, account_columns['offset'] + ['source']).dropna(
+        subset=['description', 'credit', 'balance'])
+    return offset.groupby(rollup_keys)['balance'].last().rename('offset_balance').reset_index()
+
+
+@etl_stage('mortgage_rollup', count_rows=input_rows)
+def mortgage_rollup(statements):
+    mortgage = filter_statements(statements, account_columns['mortgage'] + ['source'])
+    credit_by_type = mortgage.groupby(rollup_keys + ['txn_type'], observed=True)['credit'].sum().unstack()
+    interest_saved = mortgage.dropna(subset=['amount_in_description']).groupby(rollup_keys)['amount_in_description']
+
+    rollup = mortgage.groupby(rollup_keys)['balance'].last().rename('mortgage_balance').to_frame()
+    for txn_type in ('repayment', 'interest'):
+        rollup[txn_type] = credit_by_type[txn_type] if txn_type in credit_by_type else pd.NA
+    rollup = rollup.astype({'repayment': 'Int64', 'interest': 'Int64'})
+    # Every interest saved amount is kept, in statement order, since each one becomes a row of the monthly view
+    rollup['interest_saved'] = interest_saved.agg(list).reindex(rollup.index).map(
+        lambda amounts: amounts if isinstance(amounts, list) else [])
+    return rollup.reset_index()
+
+
+account_rollups = {'offset': offset_rollup, 'mortgage': mortgage_rollup}
+
+
+def rollup_aggregates(offset_rollup_df, mortgage_rollup_df):
+    # Rollups are ordered by source file, so the last balance of a month comes from the last file holding it
+    mortgage_by_month = mortgage_rollup_df.groupby('month')
+    interest_saved = mortgage_rollup_df[['month', 'interest_saved']].explode('interest_saved').dropna()
+
+    return {
+        'offset_balance': offset_rollup_df.groupby(['account', 'month'], sort=True)['offset_balance'].last(),
+        'mortgage_balance': mortgage_rollup_df.groupby(['account', 'month'], sort=True)['mortgage_balance'].last(),
+        'repayment': mortgage_by_month['repayment'].sum(min_count=1).dropna(),
+        'interest': mortgage_by_month['interest'].sum(min_count=1).dropna(),
+        'interest_saved': interest_saved.astype({'interest_saved': 'Int64'}).reset_index(drop=True),
+    }
+
+
+def ingest_account(account):
+    # Timed by its own stages, sync_account_statements and the account kind's rollup
+    final_df, digests = sync_account_statements(account)
+    rollup_df = sync_rollup(account.name, final_df, digests, account_rollups[account.kind],
+                            f'{startDate}|{statement_format}|{account_version(account)}')
+    return final_df, rollup_df.assign(account=account.name)
+
+
+@etl_stage('process_offset_mortgage_statistics', count_rows=lambda args, result: len(result[0]) + len(result[1]))
+def process_offset_mortgage_statistics():
+    # Statistics from the persisted monthly rollups, which are only recomputed for statement files that changed
+    ingested = parallel_accounts(ingest_account)
+    frames = {kind: [result for account, result in ingested.items() if account.kind == kind] for kind in account_kinds}
+    aggregates = rollup_aggregates(*(pd.concat([rollup_df for _, rollup_df in frames[kind]], ignore_index=True)
+                                     for kind in account_kinds))
+    monthly_df, total_df = statistics_from_aggregates(aggregates)
+
+    offset_df, mortgage_df = (merge_statements([final_df for final_df, _ in frames[kind]]) for kind in account_kinds)
+    return process_offset_statements(offset_df), process_mortgage_statements(mortgage_df), monthly_df, total_df
+
+
+@etl_stage('extract_offset_mortgage_statistics', count_rows=input_rows)
 def extract_offset_mortgage_statistics(offset, mortgage):
-    repayments = mortgage[mortgage['description'].str.contains(f"TFR FROM {accountNumber} TFR", case=False)].groupby(
-        'month').agg({'credit': 'sum'}).reset_index()
-    interest = mortgage[mortgage['description'].str.contains("Loan Interest", case=False)].groupby('month').agg(
-        {'credit': 'sum'}).reset_index()
-    mortgage['interest_saved'] = mortgage['description'].str.extract(r'\$([\d,]+\.\d{2})').astype(float)
-    interest_saved = mortgage[['month', 'interest_saved']].copy().dropna()
+    return statistics_from_aggregates({**offset_aggregates(offset), **mortgage_aggregates(mortgage)})
 
-    repayments = repayments.rename(columns={'month': 'month', 'credit': 'repayment'})
-    interest = interest.rename(columns={'month': 'month', 'credit': 'interest'})
 
-    offset_last_balance = offset.groupby('month')['balance'].last().reset_index()
+def total_balance(balances):
+    # Month-end balances summed over accounts. An account without transactions in a month carries its previous
+    # month-end balance into it.
+    if balances.index.get_level_values('account').nunique() == 1:
+        return balances.droplevel('account').sort_index()
+    by_account = balances.unstack('account').sort_index()
+    has_rows = pd.Series(True, index=balances.index).unstack('account', fill_value=False).reindex(by_account.index)
+    return by_account.where(has_rows, by_account.ffill()).sum(axis=1, min_count=1).rename_axis('month')
 
-    mortgage_last_balance = mortgage.groupby('month')['balance'].last().reset_index()
+
+def statistics_from_aggregates(aggregates):
+    repayments = aggregates['repayment'].sort_index().rename('repayment').reset_index()
+    interest = aggregates['interest'].sort_index().rename('interest').reset_index()
+    interest_saved = aggregates['interest_saved']
+
+    offset_last_balance = total_balance(aggregates['offset_balance']).rename('balance').reset_index()
+
+    mortgage_last_balance = total_balance(aggregates['mortgage_balance']).rename('balance').reset_index()
 
     result_df = pd.merge(offset_last_balance, mortgage_last_balance, on='month', suffixes=('_offset', '_mortgage'))
 
@@ -106,16 +339,18 @@ def extract_offset_mortgage_statistics(offset, mortgage):
         'Loan Balance Change',
         'Principle Paid', 'Interest Paid', 'Additional Repayments', 'Interest Saved']]
 
-    result_df['Month'] = result_df['Month'].dt.strftime('%Y-%m')
+    # Totals are summed in cents before everything is turned into dollars for display
+    total_interest_paid = result_df['Interest Paid'].sum()
+    total_interest_saved = result_df['Interest Saved'].sum()
+    total_mortgage = result_df['Mortgage Balance'].iloc[-1]
+    total_offset = result_df['Offset Balance'].iloc[-1]
+    total_offset_mortgage = result_df['Remaining Loan Balance'].iloc[-1]
 
-    total_interest_paid = result_df[['Interest Paid']].sum().item()
-    total_interest_saved = result_df[['Interest Saved']].sum().item()
-    total_mortgage = result_df[['Mortgage Balance']].iloc[-1].item()
-    total_offset = result_df[['Offset Balance']].iloc[-1].item()
-    total_offset_mortgage = result_df[['Remaining Loan Balance']].iloc[-1].item()
-
-    total_df = pd.DataFrame(
+    total_df = to_dollars(pd.DataFrame(
         [(total_mortgage, total_offset, total_offset_mortgage, total_interest_saved, total_interest_paid)],
-        columns=['Mortgage', 'Offset', 'Remaining Loan Amount', 'Interest Saved', 'Interest Paid'])
+        columns=['Mortgage', 'Offset', 'Remaining Loan Amount', 'Interest Saved', 'Interest Paid'], dtype='Int64'))
+
+    result_df = to_dollars(result_df.set_index('Month')).reset_index()
+    result_df['Month'] = month_labels(result_df['Month'])
 
     return result_df.round(0)[::-1], total_df.round(0)
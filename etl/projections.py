@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Loans are projected at most this far ahead; scenarios still owing by then are reported as never paid off
+max_projection_months = 600
+
+scenario_columns = ['Rate', 'Extra Repayment', 'Offset Growth', 'Lump Sum', 'Months', 'Payoff Month',
+                    'Total Interest', 'Interest Saved', 'Interest vs Current']
+
+
+def projection_seed(monthly_df):
+    # The latest month of the monthly view: balances, the scheduled repayment and the rate implied by its interest
+    latest = monthly_df.sort_values('Month').iloc[-1]
+    repayment = latest['Principle Paid'] + latest['Interest Paid']
+    remaining = latest['Remaining Loan Balance']
+    return {
+        'month': pd.Period(latest['Month'], freq='M'),
+        'mortgage_balance': float(latest['Mortgage Balance']),
+        'offset_balance': float(latest['Offset Balance']),
+        'repayment': float(repayment),
+        'rate': float(latest['Interest Paid'] * 12 / remaining) if remaining > 0 else 0.0,
+    }
+
+
+def scenario_grid(rates, extra_repayments, offset_growth, lump_sums):
+    # Every combination of the given values, one scenario per element of the returned arrays
+    grid = np.meshgrid(np.asarray(rates, dtype=float), np.asarray(extra_repayments, dtype=float),
+                       np.asarray(offset_growth, dtype=float), np.asarray(lump_sums, dtype=float), indexing='ij')
+    return [values.ravel() for values in grid]
+
+
+def project_payoff(mortgage_balance, offset_balance, repayment, rates, extra_repayments, offset_growth, lump_sums,
+                   max_months=max_projection_months):
+    # Steps every scenario forward together one month at a time: interest accrues on the balance not covered by
+    # the offset, then the repayment comes off. Lump sums are paid straight away.
+    rates, extra_repayments, offset_growth, lump_sums = np.broadcast_arrays(
+        *(np.asarray(values, dtype=float) for values in (rates, extra_repayments, offset_growth, lump_sums)))
+    monthly_rates = rates / 12
+    payments = repayment + extra_repayments
+
+    balance = mortgage_balance - lump_sums
+    offset = np.full(balance.shape, float(offset_balance))
+    total_interest = np.zeros(balance.shape)
+    interest_saved = np.zeros(balance.shape)
+    months = np.where(balance <= 0, 0, -1)
+    active = balance > 0
+
+    for month in range(1, max_months + 1):
+        if not active.any():
+            break
+        interest = np.maximum(balance - offset, 0) * monthly_rates * active
+        total_interest += interest
+        interest_saved += np.minimum(offset, balance) * monthly_rates * active
+        balance = np.where(active, balance + interest - payments, balance)
+        offset = np.where(active, np.maximum(offset + offset_growth, 0), offset)
+
+        paid_off = active & (balance <= 0)
+        months[paid_off] = month
+        active &= ~paid_off
+
+    return months, total_interest, interest_saved
+
+
+def project_scenarios(seed, rate_changes, extra_repayments, offset_growth, lump_sums):
+    rates, extra_repayments, offset_growth, lump_sums = scenario_grid(
+        seed['rate'] + np.asarray(rate_changes, dtype=float) / 100, extra_repayments, offset_growth, lump_sums)
+    months, total_interest, interest_saved = project_payoff(
+        seed['mortgage_balance'], seed['offset_balance'], seed['repayment'],
+        np.append(rates, seed['rate']), np.append(extra_repayments, 0), np.append(offset_growth, 0),
+        np.append(lump_sums, 0))
+
+    # The last scenario carries on exactly as things are, as the baseline the others are compared with
+    current_interest = total_interest[-1]
+    months, total_interest, interest_saved = months[:-1], total_interest[:-1], interest_saved[:-1]
+
+    paid_off = months >= 0
+    payoff_months = np.full(len(months), '', dtype=object)
+    payoff_months[paid_off] = (pd.PeriodIndex([seed['month']] * paid_off.sum()) + months[paid_off]).strftime('%Y-%m')
+
+    return pd.DataFrame({
+        'Rate': (rates * 100).round(2),
+        'Extra Repayment': extra_repayments,
+        'Offset Growth': offset_growth,
+        'Lump Sum': lump_sums,
+        'Months': np.where(paid_off, months, np.nan),
+        'Payoff Month': payoff_months,
+        'Total Interest': total_interest.round(0),
+        'Interest Saved': interest_saved.round(0),
+        'Interest vs Current': (total_interest - current_interest).round(0),
+    }, columns=scenario_columns)
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from etl.classify_transactions import other_type
+
+# Typical days between payments for each bill frequency of the budget tables
+frequency_days = {'Weekly': 7, 'Fortnightly': 14, 'Monthly': 365.25 / 12, 'Quarterly': 365.25 / 4, 'Yearly': 365.25}
+
+min_payments = 3
+# An interval counts as regular within this fraction of its frequency's typical interval, or this many days
+interval_tolerance = 0.2
+min_tolerance_days = 2
+min_regular_share = 0.75
+# Median distance of the amounts from their median, as a fraction of the median
+max_amount_spread = 0.1
+# A payee is still being paid when its last payment is at most this many intervals before the last statement
+max_missed_payments = 2
+
+recurring_columns = ['Name', 'Amount', 'Frequency', 'Payments', 'Last Paid']
+
+
+def payee_names(descriptions):
+    # Card numbers, store numbers, references and punctuation vary between payments to the same payee
+    return (descriptions.astype(str).str.upper()
+            .str.replace(r'[^A-Z&]+', ' ', regex=True)
+            .str.split().str.join(' '))
+
+
+def detect_recurring_payments(offset):
+    # Payees debited at a regular interval with a stable amount, with the bill frequency each matches. Every step
+    # is a grouped operation over all payees at once.
+    if offset is None or not len(offset):
+        return pd.DataFrame(columns=recurring_columns)
+
+    # Debits the classifier recognised, such as the loan repayment transferred out, are not bills
+    debits = offset[(offset['credit'] < 0) & (offset['txn_type'] == other_type)]
+    names = payee_names(debits['description'].cat.categories)
+    payee_codes, payees = pd.factorize(names)
+    payments = pd.DataFrame({
+        'payee': payee_codes[debits['description'].cat.codes.to_numpy()],
+        'day': debits['transactionDate'].to_numpy().astype('datetime64[D]').astype(np.int64),
+        'amount': -debits['credit'].to_numpy(dtype=float),
+    }).sort_values(['payee', 'day'], kind='stable', ignore_index=True)
+    first_of_payee = payments['payee'].ne(payments['payee'].shift())
+    payments['interval'] = payments['day'].diff().mask(first_of_payee)
+
+    by_payee = payments.groupby('payee')
+    stats = by_payee.agg(payments=('day', 'size'), last_paid=('day', 'max'), interval=('interval', 'median'),
+                         amount=('amount', 'median'))
+
+    # The frequency whose typical interval is nearest the median interval, by ratio
+    typical = np.array(list(frequency_days.values()))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        distance = np.abs(np.log(stats['interval'].to_numpy()[:, None] / typical))
+    nearest = np.nan_to_num(distance, nan=np.inf).argmin(axis=1)
+    stats['frequency'] = np.array(list(frequency_days))[nearest]
+    stats['expected'] = typical[nearest]
+    stats['tolerance'] = np.maximum(interval_tolerance * stats['expected'], min_tolerance_days)
+
+    regular = (payments['interval'] - payments['payee'].map(stats['expected'])).abs() \
+        <= payments['payee'].map(stats['tolerance'])
+    stats['regular_share'] = regular.groupby(payments['payee']).sum() / (stats['payments'] - 1)
+    deviation = (payments['amount'] - payments['payee'].map(stats['amount'])).abs()
+    stats['spread'] = deviation.groupby(payments['payee']).median() / stats['amount']
+
+    recurring = stats[
+        (stats['payments'] >= min_payments)
+        & ((stats['interval'] - stats['expected']).abs() <= stats['tolerance'])
+        & (stats['regular_share'] >= min_regular_share)
+        & (stats['spread'] <= max_amount_spread)
+        & (stats['last_paid'] >= payments['day'].max() - max_missed_payments * stats['expected'])
+    ]
+    return pd.DataFrame({
+        'Name': payees[recurring.index].str.title(),
+        'Amount': (recurring['amount'] / 100).round(2).to_numpy(),
+        'Frequency': recurring['frequency'].to_numpy(),
+        'Payments': recurring['payments'].to_numpy(),
+        'Last Paid': recurring['last_paid'].to_numpy().astype('datetime64[D]').astype(str),
+    }).sort_values(['Amount', 'Name'], ascending=[False, True], ignore_index=True)
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from glob import glob
+
+import pandas as pd
+import pyarrow as pa
+
+from etl.statement_store import store_dir, write_atomic, file_lock
+
+# Published ETL outputs, one directory of Arrow IPC files per version: the dataset's frames, the arrays of the
+# indexes built from them and a JSON file of metadata. CURRENT names the live version and the fingerprint of the
+# statement files it was built from.
+shared_dir = os.path.join(store_dir, 'shared')
+current_path = os.path.join(shared_dir, 'CURRENT')
+lock_path = os.path.join(shared_dir, 'publish.lock')
+
+
+# Bumped when the files published for a version change, so versions published the old way are rebuilt
+layout_version = 2
+
+
+def source_fingerprint(patterns, *settings):
+    sources = []
+    for pattern in patterns:
+        for path in sorted(glob(pattern)):
+            stat = os.stat(path)
+            sources.append((path, stat.st_size, stat.st_mtime_ns))
+    return hashlib.sha256(json.dumps([sources, settings, layout_version], default=str).encode()).hexdigest()[:16]
+
+
+def publish_lock():
+    # Serialises the ETL across worker processes: the first worker builds and publishes, the rest wait and map
+    return file_lock(lock_path)
+
+
+def read_current():
+    try:
+        with open(current_path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+metadata_name = 'metadata.json'
+
+
+def write_table(path, table):
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def write_frame(path, df):
+    write_table(path, pa.Table.from_pandas(df, preserve_index=False))
+
+
+def write_arrays(path, arrays):
+    # Arrays of any lengths, each stored as a single list value so it maps back as one contiguous buffer
+    write_table(path, pa.table({
+        name: pa.LargeListArray.from_arrays(pa.array([0, len(values)], type=pa.int64()), pa.array(values))
+        for name, values in arrays.items()
+    }))
+
+
+def publish_frames(frames, fingerprint, arrays=None, metadata=None):
+    # `arrays` maps a name to a dict of numpy arrays, or None; `metadata` is anything JSON serialisable
+    version = f'{time.time_ns():x}'
+    version_dir = os.path.join(shared_dir, version)
+    os.makedirs(version_dir)
+
+    for name, df in frames.items():
+        if df is not None:
+            write_frame(os.path.join(version_dir, f'{name}.arrow'), df)
+    for name, values in (arrays or {}).items():
+        if values is not None:
+            write_arrays(os.path.join(version_dir, f'{name}.arrays.arrow'), values)
+    with open(os.path.join(version_dir, metadata_name), 'w') as f:
+        json.dump(metadata or {}, f)
+
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': version, 'fingerprint': fingerprint}, f)
+
+    write_atomic(current_path, write)
+
+    # Workers still mapping an older version keep their pages until they remap; the previous one is kept so
+    # a worker that read CURRENT just before the swap can still open it
+    versions = sorted(entry for entry in os.listdir(shared_dir) if os.path.isdir(os.path.join(shared_dir, entry)))
+    for stale in versions[:-2]:
+        shutil.rmtree(os.path.join(shared_dir, stale), ignore_errors=True)
+
+    return version
+
+
+def string_dtype(arrow_type):
+    # Keep strings in the mapped Arrow buffers instead of materialising Python objects in every worker
+    return pd.ArrowDtype(arrow_type) if pa.types.is_string(arrow_type) else None
+
+
+def map_table(path):
+    try:
+        source = pa.memory_map(path)
+    except FileNotFoundError:
+        return None
+    return pa.ipc.open_file(source).read_all()
+
+
+def map_frame(path):
+    table = map_table(path)
+    if table is None:
+        return None
+    # split_blocks lets numeric columns without nulls point straight at the mapped pages (read-only)
+    return table.to_pandas(split_blocks=True, types_mapper=string_dtype)
+
+
+def map_frames(version, names):
+    version_dir = os.path.join(shared_dir, version)
+    return {name: map_frame(os.path.join(version_dir, f'{name}.arrow')) for name in names}
+
+
+def map_array_set(path):
+    table = map_table(path)
+    if table is None:
+        return None
+    # Numeric arrays are read-only views of the mapped pages; only strings are materialised as Python objects
+    return {name: table.column(name).chunk(0).values.to_numpy(zero_copy_only=False) for name in table.column_names}
+
+
+def map_arrays(version, names):
+    version_dir = os.path.join(shared_dir, version)
+    return {name: map_array_set(os.path.join(version_dir, f'{name}.arrays.arrow')) for name in names}
+
+
+def read_metadata(version):
+    with open(os.path.join(shared_dir, version, metadata_name)) as f:
+        return json.load(f)
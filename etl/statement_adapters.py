@@ -0,0 +1,98 @@
+import hashlib
+import re
+from dataclasses import dataclass
+
+from etl.classify_transactions import transaction_rules
+
+account_kinds = ('offset', 'mortgage')
+
+
+@dataclass(frozen=True)
+class StatementAdapter:
+    # How one bank's CSV export maps onto the normalized statement columns. `header` names the file's columns in
+    # order: transactionDate, description, credit, balance and optionally debit are read, anything else is skipped.
+    # In `rules`, '{account_number}' stands for the number configured on the account.
+    name: str
+    header: tuple
+    date_format: str
+    rules: tuple = ()
+    skip_rows: int = 1
+
+
+@dataclass(frozen=True)
+class Account:
+    # One statement feed. `name` is also the name of its statement store.
+    name: str
+    kind: str
+    pattern: str
+    adapter: str = 'default'
+    account_number: str = None
+
+
+adapters = {}
+
+
+def register_adapter(adapter):
+    adapters[adapter.name] = adapter
+    return adapter
+
+
+default_adapter = register_adapter(StatementAdapter(
+    name='default',
+    header=('transactionDate', 'processedDate', 'description', 'a', 'credit', 'balance'),
+    date_format='%d %b %Y',
+    rules=(
+        ('repayment', r'TFR FROM {account_number} TFR'),
+        ('interest', r'Loan Interest'),
+        # The offset side of a repayment
+        ('transfer', r'TFR TO {account_number} TFR'),
+    ),
+))
+
+
+def account_adapter(account):
+    try:
+        return adapters[account.adapter]
+    except KeyError:
+        raise ValueError(f"Account '{account.name}' uses unknown statement adapter '{account.adapter}'") from None
+
+
+def account_rules(account):
+    number = re.escape(str(account.account_number))
+    adapter_rules = [(txn_type, pattern.replace('{account_number}', number))
+                     for txn_type, pattern in account_adapter(account).rules]
+    return adapter_rules + transaction_rules
+
+
+def configured_accounts():
+    # credentials.accounts lists the accounts as dicts of Account fields, and credentials.adapters any extra bank
+    # formats as dicts of StatementAdapter fields. Without accounts there is one offset and one mortgage account
+    # in the default format, at data/offset* and data/mortgage*.
+    import credentials
+
+    for adapter in getattr(credentials, 'adapters', []):
+        register_adapter(StatementAdapter(**dict(adapter, header=tuple(adapter['header']),
+                                                 rules=tuple(tuple(rule) for rule in adapter.get('rules', ())))))
+
+    configured = getattr(credentials, 'accounts', None)
+    if configured:
+        accounts = [Account(**account) for account in configured]
+    else:
+        accounts = [Account('offset', 'offset', 'data/offset*', account_number=credentials.accountNumber),
+                    Account('mortgage', 'mortgage', 'data/mortgage*', account_number=credentials.accountNumber)]
+
+    for account in accounts:
+        if account.kind not in account_kinds:
+            raise ValueError(f"Account '{account.name}' has unknown kind '{account.kind}'")
+        account_adapter(account)
+    for kind in account_kinds:
+        if not any(account.kind == kind for account in accounts):
+            raise ValueError(f'At least one {kind} account is required')
+    if len({account.name for account in accounts}) != len(accounts):
+        raise ValueError('Account names must be unique')
+    return accounts
+
+
+def adapter_version(adapter):
+    # Changes whenever files read with this adapter would parse differently
+    return hashlib.sha256(repr((adapter.header, adapter.date_format, adapter.skip_rows)).encode()).hexdigest()[:16]
@@ -0,0 +1,74 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv
+
+from etl.statement_adapters import default_adapter
+
+# The normalized statement columns every adapter reads into; any other column in a file is skipped by the reader
+schema = {
+    'transactionDate': pa.timestamp('ns'),
+    'description': pa.string(),
+    'credit': pa.float64(),
+    'balance': pa.float64(),
+}
+
+
+@lru_cache(maxsize=None)
+def csv_options(adapter, block_size=None):
+    column_types = dict(schema, debit=pa.float64()) if 'debit' in adapter.header else schema
+    read_options = csv.ReadOptions(column_names=list(adapter.header), skip_rows=adapter.skip_rows,
+                                   **({'block_size': block_size} if block_size else {}))
+    convert_options = csv.ConvertOptions(
+        column_types=column_types,
+        include_columns=list(column_types),
+        timestamp_parsers=[adapter.date_format],
+        strings_can_be_null=True,
+    )
+    return read_options, convert_options
+
+
+def normalize(table):
+    # Banks with separate debit and credit columns get a single signed credit column
+    if 'debit' not in table.column_names:
+        return table
+    credit = pc.if_else(pc.is_null(table['credit']), pc.negate(table['debit']), table['credit'])
+    return table.set_column(table.column_names.index('credit'), 'credit', credit).drop(['debit'])
+
+
+def read_statement(csv_file, adapter=default_adapter):
+    read_options, convert_options = csv_options(adapter)
+    return normalize(csv.read_csv(csv_file, read_options=read_options, convert_options=convert_options))
+
+
+def read_statements(csv_files, adapter=default_adapter, max_workers=None):
+    # Arrow releases the GIL while parsing, so a thread pool reads many small monthly exports in parallel.
+    # The tables are concatenated before a single conversion to pandas, tagged with the file they came from.
+    if not csv_files:
+        return empty_statement().assign(source=pd.Series(dtype=object))
+
+    max_workers = max_workers or min(len(csv_files), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        tables = list(pool.map(lambda csv_file: read_statement(csv_file, adapter), csv_files))
+
+    sources = np.repeat(np.asarray(csv_files, dtype=object), [table.num_rows for table in tables])
+    table = pa.concat_tables(tables).append_column('source', pa.array(sources, type=pa.string()))
+    return table.to_pandas()
+
+
+def iter_statement_chunks(csv_files, chunk_size, adapter=default_adapter):
+    # Stream each file in blocks of roughly `chunk_size` bytes so only one block is decoded at a time
+    read_options, convert_options = csv_options(adapter, chunk_size)
+    for csv_file in csv_files:
+        with csv.open_csv(csv_file, read_options=read_options, convert_options=convert_options) as reader:
+            for batch in reader:
+                yield normalize(pa.Table.from_batches([batch])).to_pandas()
+
+
+def empty_statement():
+    return pd.DataFrame({col: pd.Series(dtype=dtype.to_pandas_dtype()) for col, dtype in schema.items()})
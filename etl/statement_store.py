@@ -0,0 +1,228 @@
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from glob import glob
+
+import pandas as pd
+
+store_dir = 'data/store'
+manifest_path = os.path.join(store_dir, 'manifest.json')
+
+
+def store_path(name):
+    return os.path.join(store_dir, f'{name}.parquet')
+
+
+@contextmanager
+def file_lock(path):
+    # An exclusive flock, held against other processes (a background refresh, other workers) and other threads
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def store_lock(name):
+    return file_lock(os.path.join(store_dir, f'{name}.lock'))
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest():
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def write_atomic(path, write):
+    # Each writer gets its own temporary file next to `path`, so concurrent writers never share one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=f'{os.path.basename(path)}.',
+                                    suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def save_manifest(manifest):
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+
+    write_atomic(manifest_path, write)
+
+
+def update_manifest(update):
+    # Accounts are synced from parallel threads and processes, so each applies its own entries to a freshly loaded
+    # manifest
+    with store_lock('manifest'):
+        manifest = load_manifest()
+        update(manifest)
+        save_manifest(manifest)
+
+
+def read_store(name):
+    # Descriptions come back dictionary encoded, as categoricals, instead of one Python string per row
+    try:
+        return pd.read_parquet(store_path(name), read_dictionary=['description'])
+    except FileNotFoundError:
+        return None
+
+
+def sync_statements(name, pattern, read_files, classify, classifier_version, reader_version=None):
+    # Parse only statement files that are new or whose contents changed since the last run, and fold them
+    # into the persistent store for `name`. Unchanged files are recognised by size and mtime without hashing.
+    # A different `reader_version` means the files would parse differently, so every file is read again.
+    # Returns the store, the files read and the sha256 of each file as it was folded in.
+    # Held for the whole sync so a refresh in another process can not fold in the same files at the same time
+    with store_lock(name):
+        os.makedirs(store_dir, exist_ok=True)
+        manifest = load_manifest()
+        reread = manifest.get('readers', {}).get(name) != reader_version
+        entries = {} if reread else manifest.get(name, {})
+        file_paths = sorted(glob(pattern))
+
+        changed = []
+        current = {}
+        for path in file_paths:
+            stat = os.stat(path)
+            entry = entries.get(path)
+            if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                current[path] = entry
+                continue
+
+            sha256 = file_digest(path)
+            if entry and entry['sha256'] == sha256:
+                current[path] = dict(entry, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                continue
+
+            current[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+            changed.append(path)
+
+        removed = set(entries) - set(current)
+        stored_df = None if reread else read_store(name)
+        reclassify = manifest.get('classifiers', {}).get(name) != classifier_version
+
+        def update(manifest):
+            manifest[name] = current
+            manifest.setdefault('classifiers', {})[name] = classifier_version
+            manifest.setdefault('readers', {})[name] = reader_version
+
+        if not changed and not removed and not reclassify and stored_df is not None:
+            if current != entries:
+                update_manifest(update)
+            return stored_df, [], file_digests(current)
+
+        dfs = []
+        if stored_df is not None:
+            kept_df = stored_df[~stored_df['source'].isin(set(changed) | removed)].copy()
+            dfs.append(classify(kept_df) if reclassify else kept_df)
+
+        if changed or not dfs:
+            dfs.append(classify(read_files(changed)))
+
+        final_df = pd.concat(dfs, ignore_index=True)
+
+        # Keep rows grouped by source file in path order so month-end lookups see each file's rows in sequence
+        order = {path: i for i, path in enumerate(file_paths)}
+        final_df = final_df.iloc[final_df['source'].map(order).argsort(kind='stable')].reset_index(drop=True)
+
+        date_ranges = final_df[final_df['source'].isin(changed)].groupby('source')['transactionDate'].agg(['min', 'max'])
+        for path, (first_date, last_date) in date_ranges.iterrows():
+            current[path].update(first_date=first_date.isoformat(), last_date=last_date.isoformat())
+
+        write_atomic(store_path(name), lambda tmp_path: final_df.to_parquet(tmp_path, index=False))
+        update_manifest(update)
+
+        return final_df, changed, file_digests(current)
+
+
+def file_digests(entries):
+    return {path: entry['sha256'] for path, entry in entries.items()}
+
+
+def sync_rollup(name, statements, digests, rollup, key):
+    # Per-month rollups of `name`, kept per source file and recomputed only for files whose contents changed since
+    # they were last rolled up. `digests` are the ones sync_statements returned with `statements`, not the manifest's,
+    # which another process may have moved on since. `key` identifies everything else the rollups depend on; when it
+    # changes they are all rebuilt.
+    # Held for the whole sync, as in sync_statements
+    with store_lock(f'{name}_rollup'):
+        manifest = load_manifest()
+        rollup_name = f'{name}_rollup'
+        stored_df = read_store(rollup_name)
+
+        rolled = manifest.get('rollups', {}).get(name, {})
+        if stored_df is None or rolled.get('key') != key:
+            stored_df, rolled = None, {}
+        rolled_digests = rolled.get('sources', {})
+
+        touched = {path for path, sha256 in digests.items() if rolled_digests.get(path) != sha256}
+        removed = set(rolled_digests) - set(digests)
+        if stored_df is not None and not touched and not removed:
+            return stored_df
+
+        dfs = [stored_df[~stored_df['source'].isin(touched | removed)]] if stored_df is not None else []
+        touched_df = statements[statements['source'].isin(touched)]
+        if len(touched_df) or not dfs:
+            dfs.append(rollup(touched_df.copy()))
+
+        rollup_df = pd.concat(dfs, ignore_index=True).sort_values(['source', 'month'], kind='stable', ignore_index=True)
+
+        write_atomic(store_path(rollup_name), lambda tmp_path: rollup_df.to_parquet(tmp_path, index=False))
+        update_manifest(lambda manifest: manifest.setdefault('rollups', {}).update(
+            {name: {'key': key, 'sources': digests}}))
+
+        return rollup_df
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def record_date_ranges(name, date_ranges):
+    # Date ranges of files streamed without being ingested, as {path: file_stamp plus first_date and last_date}.
+    # They are kept apart from the store's entries, which sync_statements takes to mean the rows are stored.
+    def update(manifest):
+        streamed = manifest.setdefault('streamed', {})
+        entries = {path: entry for path, entry in streamed.get(name, {}).items() if os.path.exists(path)}
+        entries.update(date_ranges)
+        streamed[name] = entries
+
+    update_manifest(update)
+
+
+def statement_files(name, pattern, start_date):
+    # Statement files that may hold rows after `start_date`. Files already ingested or streamed whose last
+    # transaction is on or before it are skipped without opening them; anything unknown or modified since is kept.
+    manifest = load_manifest()
+    recorded = (manifest.get(name, {}), manifest.get('streamed', {}).get(name, {}))
+    start = pd.Timestamp(start_date).isoformat()
+    file_paths = []
+    for path in sorted(glob(pattern)):
+        entries = [entries[path] for entries in recorded if 'last_date' in entries.get(path, {})]
+        if entries:
+            stamp = file_stamp(path)
+            if any(entry['size'] == stamp['size'] and entry['mtime_ns'] == stamp['mtime_ns']
+                   and entry['last_date'] <= start for entry in entries):
+                continue
+        file_paths.append(path)
+    return file_paths
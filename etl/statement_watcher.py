@@ -0,0 +1,122 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+from fnmatch import fnmatch
+
+from etl.shared_dataset import source_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# auto uses inotify where the platform has it and polls otherwise; poll forces polling and off disables watching
+watch_mode = os.environ.get('FINANCE_TRACKER_WATCH', 'auto')
+poll_seconds = float(os.environ.get('FINANCE_TRACKER_WATCH_POLL_SECONDS', 5))
+# A batch of statements copied in together is ingested once, after the directory has been quiet this long
+settle_seconds = float(os.environ.get('FINANCE_TRACKER_WATCH_SETTLE_SECONDS', 1))
+
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+watch_mask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+event_header = struct.Struct('iIII')
+
+
+def open_inotify(directories):
+    # An inotify descriptor watching `directories` mapped from watch descriptor to directory, or None where
+    # inotify is not available
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        inotify_init1, inotify_add_watch = libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+
+    fd = inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        return None
+    watches = {}
+    for directory in directories:
+        wd = inotify_add_watch(fd, os.fsencode(directory), watch_mask)
+        if wd < 0:
+            logger.warning('Can not watch %s: %s', directory, os.strerror(ctypes.get_errno()))
+            os.close(fd)
+            return None
+        watches[wd] = directory
+    return fd, watches
+
+
+def read_events(fd, watches):
+    # Paths named by the pending events; None stands for events the kernel dropped when its queue overflowed
+    paths = []
+    while True:
+        try:
+            buffer = os.read(fd, 1 << 16)
+        except BlockingIOError:
+            return paths
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = event_header.unpack_from(buffer, offset)
+            offset += event_header.size
+            name = os.fsdecode(buffer[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                paths.append(None)
+            elif wd in watches:
+                paths.append(os.path.join(watches[wd], name))
+
+
+def watch_inotify(fd, watches, patterns, on_change, stop):
+    pending = False
+    try:
+        while not stop.is_set():
+            ready, _, _ = select.select([fd], [], [], settle_seconds if pending else 1)
+            if ready:
+                paths = read_events(fd, watches)
+                pending = pending or any(path is None or any(fnmatch(path, pattern) for pattern in patterns)
+                                         for path in paths)
+            elif pending:
+                pending = False
+                on_change()
+    finally:
+        os.close(fd)
+
+
+def watch_polling(patterns, on_change, stop):
+    fingerprint = seen = source_fingerprint(patterns)
+    while not stop.wait(poll_seconds):
+        latest = source_fingerprint(patterns)
+        # Files still being copied change between polls, so a change is only picked up once it has settled
+        if latest == seen and latest != fingerprint:
+            fingerprint = latest
+            on_change()
+        seen = latest
+
+
+def watch_statements(patterns, on_change):
+    # Calls `on_change` from a background thread after statement files matching `patterns` are added, replaced
+    # or removed. Returns an event that stops the watcher when set, or None when watching is switched off.
+    if watch_mode == 'off':
+        return None
+
+    directories = sorted({os.path.dirname(pattern) or '.' for pattern in patterns})
+    inotify = None
+    # Patterns with wildcards in the directory part can match directories created later, which only polling sees
+    if watch_mode != 'poll' and not any(char in directory for directory in directories for char in '*?['):
+        inotify = open_inotify(directories)
+
+    stop = threading.Event()
+    if inotify is not None:
+        target, args = watch_inotify, (*inotify, patterns, on_change, stop)
+    else:
+        target, args = watch_polling, (patterns, on_change, stop)
+    logger.info('Watching %s for new statements (%s)', ', '.join(directories),
+                'inotify' if inotify is not None else 'polling')
+    threading.Thread(target=target, args=args, name='statement-watcher', daemon=True).start()
+    return stop
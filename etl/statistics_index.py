@@ -0,0 +1,145 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Period lengths offered for the statistics views, as pandas period frequencies
+granularities = {'W': 'Weekly', 'M': 'Monthly', 'Q': 'Quarterly', 'Y': 'Yearly'}
+flow_names = ('repayment', 'interest', 'interest_paid', 'interest_saved')
+statistics_columns = ['Mortgage Balance', 'Offset Balance', 'Remaining Loan Balance', 'Loan Balance Change',
+                      'Principle Paid', 'Interest Paid', 'Additional Repayments', 'Interest Saved']
+total_columns = ['Mortgage', 'Offset', 'Remaining Loan Amount', 'Interest Saved', 'Interest Paid']
+
+
+@dataclass(frozen=True)
+class StatisticsIndex:
+    # Daily loan statistics in cents from first_day (days since the epoch) onwards. Flows are cumulative sums with
+    # a leading zero, so the flow over days [a, b] is flows[b + 1] - flows[a]. Balances are the end-of-day totals
+    # over all accounts, with each account's last balance carried into the days it has no transactions.
+    first_day: int
+    flows: dict
+    offset_balance: np.ndarray
+    mortgage_balance: np.ndarray
+
+
+def day_numbers(dates):
+    return dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def day_number(date):
+    return int(np.datetime64(pd.Timestamp(date).date(), 'D').astype(np.int64))
+
+
+def daily_balance(df, days, first_day, day_count):
+    by_account = df.assign(day=days).groupby(['account', 'day'], observed=True, sort=True)['balance'].last()
+    by_account = by_account.astype(float).unstack('account').reindex(np.arange(first_day, first_day + day_count))
+    return by_account.ffill().sum(axis=1, min_count=1).to_numpy()
+
+
+def daily_flow(days, values, first_day, day_count):
+    flow = np.bincount(days - first_day, weights=values, minlength=day_count)
+    return np.concatenate([[0.0], np.cumsum(flow)])
+
+
+def build_statistics_index(offset, mortgage):
+    # Built with the dataset from the offset and mortgage transactions; None when they are not held in memory
+    if offset is None or mortgage is None or not len(offset) or not len(mortgage):
+        return None
+
+    offset_days, mortgage_days = day_numbers(offset['transactionDate']), day_numbers(mortgage['transactionDate'])
+    first_day = int(min(offset_days.min(), mortgage_days.min()))
+    day_count = int(max(offset_days.max(), mortgage_days.max())) - first_day + 1
+
+    credit = mortgage['credit'].to_numpy(dtype=float, na_value=0)
+    txn_type = mortgage['txn_type'].astype(object).to_numpy()
+    interest = np.where(txn_type == 'interest', credit, 0)
+    flows = {
+        'repayment': daily_flow(mortgage_days, np.where(txn_type == 'repayment', credit, 0), first_day, day_count),
+        'interest': daily_flow(mortgage_days, interest, first_day, day_count),
+        # Interest is counted as paid whichever way it was charged, as the monthly view does
+        'interest_paid': daily_flow(mortgage_days, np.abs(interest), first_day, day_count),
+        'interest_saved': daily_flow(mortgage_days, mortgage['amount_in_description'].to_numpy(dtype=float, na_value=0),
+                                     first_day, day_count),
+    }
+    return StatisticsIndex(first_day=first_day, flows=flows,
+                           offset_balance=daily_balance(offset, offset_days, first_day, day_count),
+                           mortgage_balance=daily_balance(mortgage, mortgage_days, first_day, day_count))
+
+
+def statistics_index_arrays(index):
+    # The index as named arrays, for publishing next to a shared dataset's frames
+    if index is None:
+        return None
+    return {'first_day': np.array([index.first_day]), 'offset_balance': index.offset_balance,
+            'mortgage_balance': index.mortgage_balance, **{f'flow_{name}': index.flows[name] for name in flow_names}}
+
+
+def statistics_index_from_arrays(arrays):
+    if arrays is None:
+        return None
+    return StatisticsIndex(first_day=int(arrays['first_day'][0]),
+                           flows={name: arrays[f'flow_{name}'] for name in flow_names},
+                           offset_balance=arrays['offset_balance'], mortgage_balance=arrays['mortgage_balance'])
+
+
+def clip_range(index, start_date, end_date):
+    # Day positions [first, last] of a date range within the index; open ends run to the first or last day
+    day_count = len(index.offset_balance)
+    first = 0 if start_date is None else day_number(start_date) - index.first_day
+    last = day_count - 1 if end_date is None else day_number(end_date) - index.first_day
+    return max(first, 0), min(last, day_count - 1)
+
+
+def period_bounds(index, first, last, granularity):
+    # First and last day positions of each period of `granularity` overlapping days [first, last]
+    start = pd.Timestamp(np.datetime64(index.first_day + first, 'D'))
+    end = pd.Timestamp(np.datetime64(index.first_day + last, 'D'))
+    periods = pd.period_range(start, end, freq=granularity)
+    starts = day_numbers(periods.start_time) - index.first_day
+    ends = day_numbers(periods.end_time) - index.first_day
+    return periods, np.maximum(starts, first), np.minimum(ends, last)
+
+
+def range_statistics(index, starts, ends):
+    # Statistics in cents over the day ranges [starts, ends], each answered in constant time from the index
+    flows = {name: index.flows[name][ends + 1] - index.flows[name][starts] for name in flow_names}
+    remaining = index.offset_balance + index.mortgage_balance
+    before = np.where(starts > 0, remaining[np.maximum(starts - 1, 0)], np.nan)
+    change = remaining[ends] - before
+    return pd.DataFrame({
+        'Mortgage Balance': np.abs(index.mortgage_balance[ends]),
+        'Offset Balance': index.offset_balance[ends],
+        'Remaining Loan Balance': np.abs(remaining[ends]),
+        'Loan Balance Change': change,
+        'Principle Paid': flows['repayment'] + flows['interest'],
+        'Interest Paid': flows['interest_paid'],
+        'Additional Repayments': change - flows['repayment'],
+        'Interest Saved': flows['interest_saved'],
+    })
+
+
+def period_statistics(index, start_date=None, end_date=None, granularity='M'):
+    # The monthly view's columns for each period in the range, newest first and in rounded dollars
+    first, last = clip_range(index, start_date, end_date)
+    if first > last:
+        return pd.DataFrame(columns=['Month'] + statistics_columns)
+    periods, starts, ends = period_bounds(index, first, last, granularity)
+    result_df = range_statistics(index, starts, ends) / 100
+    # Weeks are labelled by their first day
+    result_df.insert(0, 'Month', periods.start_time.strftime('%Y-%m-%d') if granularity == 'W' else periods.astype(str))
+    return result_df.round(0)[::-1]
+
+
+def range_totals(index, start_date=None, end_date=None):
+    # The total view over a date range: balances at its end and interest over it, in rounded dollars
+    first, last = clip_range(index, start_date, end_date)
+    if first > last:
+        return pd.DataFrame(columns=total_columns)
+    statistics = range_statistics(index, np.array([first]), np.array([last])) / 100
+    return pd.DataFrame({
+        'Mortgage': statistics['Mortgage Balance'],
+        'Offset': statistics['Offset Balance'],
+        'Remaining Loan Amount': statistics['Remaining Loan Balance'],
+        'Interest Saved': statistics['Interest Saved'],
+        'Interest Paid': statistics['Interest Paid'],
+    }).round(0)
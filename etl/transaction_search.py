@@ -0,0 +1,145 @@
+import functools
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from etl.process_statements import to_dollars
+
+search_columns = ['Date', 'Account', 'Description', 'Amount', 'Balance', 'Type']
+no_descriptions = np.array([], dtype=np.int32)
+
+
+@dataclass(frozen=True)
+class SearchIndex:
+    # Transactions of all sources ordered by date. Descriptions are indexed once per distinct description, which
+    # the categorical description column already provides, rather than once per row.
+    frames: tuple
+    descriptions: pd.Index
+    # Trigram of a lowercased description: sorted ids of the descriptions containing it
+    postings: dict
+    # One entry per transaction, in date order: description id (missing descriptions point one past the last
+    # description), date, amount in cents, and the source frame and row it came from
+    codes: np.ndarray
+    dates: np.ndarray
+    amounts: np.ndarray
+    sources: np.ndarray
+    rows: np.ndarray
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def build_postings(descriptions):
+    postings = {}
+    for description_id, description in enumerate(descriptions):
+        for trigram in trigrams(description):
+            postings.setdefault(trigram, []).append(description_id)
+    return {trigram: np.array(ids, dtype=np.int32) for trigram, ids in postings.items()}
+
+
+def build_search_index(frames):
+    # Built with the dataset, from the statements process_offset_statements and process_mortgage_statements return
+    frames = tuple(df for df in frames if df is not None and len(df))
+    if not frames:
+        return None
+
+    descriptions = union_categoricals([df['description'].astype('category') for df in frames])
+    categories = descriptions.categories.astype(str).str.lower()
+    codes = np.where(descriptions.codes < 0, len(categories), descriptions.codes).astype(np.int32)
+
+    dates = np.concatenate([df['transactionDate'].to_numpy() for df in frames])
+    amounts = np.concatenate([df['credit'].to_numpy(dtype=float, na_value=np.nan) for df in frames])
+    sources = np.concatenate([np.full(len(df), source, dtype=np.int8) for source, df in enumerate(frames)])
+    rows = np.concatenate([np.arange(len(df), dtype=np.int64) for df in frames])
+    order = np.argsort(dates, kind='stable')
+
+    return SearchIndex(frames=frames, descriptions=categories, postings=build_postings(categories), codes=codes[order],
+                       dates=dates[order], amounts=amounts[order], sources=sources[order], rows=rows[order])
+
+
+def search_index_arrays(index):
+    # The index as named arrays, for publishing next to a shared dataset's frames. Posting lists are concatenated
+    # with the offset where each trigram's list ends.
+    if index is None:
+        return None
+    grams = list(index.postings)
+    postings = [index.postings[gram] for gram in grams]
+    return {'descriptions': index.descriptions.to_numpy(dtype=object), 'trigrams': np.array(grams, dtype=object),
+            'posting_ends': np.cumsum([len(ids) for ids in postings], dtype=np.int64),
+            'posting_ids': np.concatenate(postings) if postings else no_descriptions,
+            'codes': index.codes, 'dates': index.dates, 'amounts': index.amounts, 'sources': index.sources,
+            'rows': index.rows}
+
+
+def search_index_from_arrays(arrays, frames):
+    # `frames` are the statements the index was built from, as passed to build_search_index
+    if arrays is None:
+        return None
+    postings = np.split(arrays['posting_ids'], arrays['posting_ends'][:-1])
+    return SearchIndex(frames=tuple(df for df in frames if df is not None and len(df)),
+                       descriptions=pd.Index(arrays['descriptions'], dtype=object),
+                       postings=dict(zip(arrays['trigrams'], postings)), codes=arrays['codes'], dates=arrays['dates'],
+                       amounts=arrays['amounts'], sources=arrays['sources'], rows=arrays['rows'])
+
+
+def token_matches(index, token):
+    # Ids of the descriptions containing `token`. Every trigram of the token must be in a description for it to
+    # match, so only the descriptions in all of the token's posting lists are checked.
+    grams = trigrams(token)
+    if not grams:
+        return np.flatnonzero(index.descriptions.str.contains(token, regex=False))
+    postings = sorted((index.postings.get(gram, no_descriptions) for gram in grams), key=len)
+    ids = functools.reduce(np.intersect1d, postings)
+    if len(grams) == 1:
+        return ids
+    return ids[index.descriptions[ids].str.contains(token, regex=False)]
+
+
+def description_mask(index, query):
+    # Whether each description holds every whitespace separated term of the query, case insensitively
+    mask = np.ones(len(index.descriptions) + 1, dtype=bool)
+    mask[-1] = False
+    for token in (query or '').lower().split():
+        matches = np.zeros_like(mask)
+        matches[token_matches(index, token)] = True
+        mask &= matches
+    return mask
+
+
+def search_positions(index, query=None, start_date=None, end_date=None, min_amount=None, max_amount=None):
+    # Positions in the index of the matching transactions, newest first
+    lo = 0 if start_date is None else np.searchsorted(index.dates, np.datetime64(pd.Timestamp(start_date)), 'left')
+    hi = len(index.dates) if end_date is None else np.searchsorted(
+        index.dates, np.datetime64(pd.Timestamp(end_date) + pd.Timedelta(days=1)), 'left')
+
+    keep = np.ones(hi - lo, dtype=bool) if not query or not query.strip() else \
+        description_mask(index, query)[index.codes[lo:hi]]
+    if min_amount is not None:
+        keep &= index.amounts[lo:hi] >= round(min_amount * 100)
+    if max_amount is not None:
+        keep &= index.amounts[lo:hi] <= round(max_amount * 100)
+    return (np.flatnonzero(keep) + lo)[::-1]
+
+
+def search_records(index, positions):
+    # The transactions at `positions` as table rows, in the order given
+    pages = []
+    for source, df in enumerate(index.frames):
+        selected = np.flatnonzero(index.sources[positions] == source)
+        if len(selected):
+            page = df.iloc[index.rows[positions[selected]]]
+            pages.append(pd.DataFrame({
+                'Date': page['transactionDate'].dt.strftime('%Y-%m-%d').to_numpy(),
+                'Account': page['account'].astype(str).to_numpy(),
+                'Description': page['description'].astype(object).to_numpy(),
+                'Amount': to_dollars(page['credit']).to_numpy(),
+                'Balance': to_dollars(page['balance']).to_numpy(),
+                'Type': page['txn_type'].astype(str).to_numpy(),
+            }, index=selected))
+    if not pages:
+        return []
+    records = pd.concat(pages).sort_index()
+    return records.astype(object).where(records.notna(), None).to_dict('records')
@@ -2,17 +2,7 @@ import dash_core_components as dcc
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 import pandas as pd
-from etl.process_statements import process_offset_statements
 
-df1 = process_offset_statements()
-
-scatter_trace = go.Scatter(
-    x=df1['transactionDate'],
-    y=df1['balance'],
-    mode='markers',
-    marker=dict(color='black'),
-    name='balance'
-)
 
 scatter_layout = go.Layout(
     title='',
@@ -27,12 +17,27 @@ scatter_layout = go.Layout(
 )
 
 
-scatter_fig = go.Figure(data=[scatter_trace], layout=scatter_layout)
+def scatter_figure(dates, balances, revision=None):
+    # WebGL keeps large point counts responsive; the callback downsamples to a fixed budget beforehand
+    scatter_trace = go.Scattergl(
+        x=dates,
+        y=balances,
+        mode='markers',
+        marker=dict(color='black'),
+        name='balance'
+    )
+
+    figure = go.Figure(data=[scatter_trace], layout=scatter_layout)
+    # The same revision keeps the user's zoom when the points for a zoomed window are swapped in
+    figure.update_layout(uirevision=revision)
+    return figure
+
 
+# The figure is filled in by the balance scatter callback once the offset statements have been loaded
 mortgage_graph = dbc.Col(
         dcc.Graph(
             id='scatter-plot',
-            figure=scatter_fig
+            figure=go.Figure(layout=scatter_layout)
         )
     )
 
@@ -0,0 +1,43 @@
+import dash_bootstrap_components as dbc
+import dash_html_components as html
+from dash_table import DataTable
+
+from etl.offset_interest import reconciliation_columns, what_if_columns
+
+# Each input takes a comma separated list; every combination is run over the whole history
+interest_inputs = [
+    ('interest-rate-changes', 'Rate change (% points)', '-0.5, 0, 0.5'),
+    ('interest-offset-changes', 'Offset balance change ($)', '-10000, 0, 10000, 50000'),
+]
+
+table_style = {'fontSize': '12px', 'backgroundColor': '#343a40', 'color': '#fff', 'border': '1px solid #495057',
+               'overflowX': 'auto', 'overflowY': 'auto'}
+
+interest_controls = dbc.Row([
+    dbc.Col([
+        dbc.Label(label, html_for=input_id),
+        dbc.Input(id=input_id, value=value, debounce=True),
+    ]) for input_id, label, value in interest_inputs
+], style={'margin-bottom': '10px'})
+
+reconciliation_status = html.Div(id='reconciliation-status')
+
+reconciliation_table = DataTable(
+    id='reconciliation-table',
+    columns=[{'name': col, 'id': col} for col in reconciliation_columns],
+    data=[],
+    page_size=12,
+    style_table=table_style,
+    style_cell={'backgroundColor': '#495057', 'color': '#fff'},
+    style_data_conditional=[{'if': {'filter_query': '{Diverges} = "Yes"'}, 'backgroundColor': '#8b3a3a'}]
+)
+
+what_if_status = html.Div(id='interest-what-if-status')
+
+what_if_table = DataTable(
+    id='interest-what-if-table',
+    columns=[{'name': col, 'id': col} for col in what_if_columns],
+    data=[],
+    style_table=table_style,
+    style_cell={'backgroundColor': '#495057', 'color': '#fff'}
+)
@@ -0,0 +1,14 @@
+import dash_bootstrap_components as dbc
+import dash_html_components as html
+
+refresh_controls = dbc.Row([
+    dbc.Col([
+        html.Button('Refresh data', id='refresh-button', className='me-2 custom-save-button'),
+        html.Button('Cancel', id='cancel-refresh-button', className='custom-save-button', disabled=True),
+    ], width='auto'),
+    # Each ETL stage is reported here as it finishes, then the outcome of the refresh
+    dbc.Col([
+        html.Span(id='refresh-progress'),
+        html.Span(id='refresh-status'),
+    ]),
+], align='center', style={'margin-top': '20px'})
@@ -0,0 +1,71 @@
+import dash_bootstrap_components as dbc
+import dash_core_components as dcc
+import dash_html_components as html
+from dash_table import DataTable
+
+from etl.projections import scenario_columns
+from layouts.statistics_tables import chart_layout, placeholder_figure
+
+# Each input takes a comma separated list; every combination of the values is projected
+scenario_inputs = [
+    ('scenario-rate-changes', 'Rate change (% points)', '-1, -0.5, 0, 0.5, 1'),
+    ('scenario-extra-repayments', 'Extra repayment ($/month)', '0, 500, 1000, 2000'),
+    ('scenario-offset-growth', 'Offset growth ($/month)', '0, 250, 500'),
+    ('scenario-lump-sums', 'Lump sum now ($)', '0, 10000, 50000'),
+]
+
+best_scenarios_count = 10
+
+
+def scenario_figure(scenarios, current):
+    return {
+        'data': [
+            {
+                'type': 'scattergl',
+                'mode': 'markers',
+                'x': scenarios['Months'],
+                'y': scenarios['Total Interest'],
+                'text': [f'{rate}% +${extra:,.0f}/m, offset +${growth:,.0f}/m, lump ${lump:,.0f}'
+                         for rate, extra, growth, lump in scenarios[['Rate', 'Extra Repayment', 'Offset Growth',
+                                                                     'Lump Sum']].itertuples(index=False)],
+                'marker': {'color': scenarios['Extra Repayment'], 'colorscale': 'Viridis', 'showscale': True,
+                           'colorbar': {'title': 'Extra $/m'}},
+                'name': 'Scenarios',
+            },
+            {
+                'type': 'scatter',
+                'mode': 'markers',
+                'x': [current['Months']],
+                'y': [current['Total Interest']],
+                'marker': {'color': 'red', 'size': 12, 'symbol': 'x'},
+                'name': 'Current',
+            },
+        ],
+        'layout': {
+            'title': 'Months to Payoff vs Total Interest',
+            'xaxis': {'title': 'Months to payoff'},
+            'yaxis': {'title': 'Total interest'},
+            **chart_layout,
+        }
+    }
+
+
+scenario_controls = dbc.Row([
+    dbc.Col([
+        dbc.Label(label, html_for=input_id),
+        dbc.Input(id=input_id, value=value, debounce=True),
+    ]) for input_id, label, value in scenario_inputs
+], style={'margin-bottom': '10px'})
+
+scenario_status = html.Div(id='scenario-status')
+
+scenario_chart = dcc.Graph(id='scenario-chart', figure=placeholder_figure('Months to Payoff vs Total Interest'))
+
+best_scenarios_table = DataTable(
+    id='best-scenarios-table',
+    columns=[{'name': col, 'id': col} for col in scenario_columns],
+    data=[],
+    style_table={'fontSize': '12px', 'backgroundColor': '#343a40', 'color': '#fff', 'border': '1px solid #495057',
+                 'overflowX': 'auto', 'overflowY': 'auto'},
+    style_cell={'backgroundColor': '#495057', 'color': '#fff'}
+)
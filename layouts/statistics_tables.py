@@ -1,17 +1,49 @@
 from dash_table import DataTable
-from etl.process_statements import process_offset_statements, process_mortgage_statements, extract_offset_mortgage_statistics
+import dash_bootstrap_components as dbc
 import dash_core_components as dcc
+import dash_html_components as html
 import plotly.graph_objects as go
 
-offset = process_offset_statements()
-mortgage = process_mortgage_statements()
+from etl.statistics_index import granularities
 
-monthly_df, total_df = extract_offset_mortgage_statistics(offset, mortgage)
+monthly_columns = ['Month', 'Mortgage Balance', 'Offset Balance', 'Remaining Loan Balance', 'Loan Balance Change',
+                   'Principle Paid', 'Interest Paid', 'Additional Repayments', 'Interest Saved']
+total_columns = ['Mortgage', 'Offset', 'Remaining Loan Amount', 'Interest Saved', 'Interest Paid']
 
+chart_layout = {
+    'plot_bgcolor': '#343a40',  # Dark background color for the plot area
+    'paper_bgcolor': '#495057',  # Dark background color for the entire graph
+    'font': {'color': '#fff'},  # White text color
+}
+
+monthly_page_size = 12
+
+# Restrict the total view and the charts to a date range and pick the period each bar covers
+statistics_range_controls = dbc.Row([
+    dbc.Col([
+        dbc.Label('Dates', html_for='statistics-dates'),
+        html.Br(),
+        dcc.DatePickerRange(id='statistics-dates', display_format='YYYY-MM-DD', clearable=True),
+    ], width='auto'),
+    dbc.Col([
+        dbc.Label('Period', html_for='statistics-granularity'),
+        dbc.RadioItems(id='statistics-granularity', value='M', inline=True,
+                       options=[{'label': label, 'value': freq} for freq, label in granularities.items()]),
+    ]),
+], style={'margin-bottom': '20px'})
+
+# Tables and charts start empty; their data is filled in by the statistics callbacks once the ETL has finished.
+# Both tables page, sort and filter on the server so only the visible rows are sent to the browser.
 total_view_table = DataTable(
     id='total-view-table',
-    columns=[{'name': col, 'id': col} for col in total_df.columns],
-    data=total_df.to_dict('records'),
+    columns=[{'name': col, 'id': col} for col in total_columns],
+    data=[],
+    page_action='custom',
+    page_current=0,
+    page_size=monthly_page_size,
+    sort_action='custom',
+    sort_mode='multi',
+    sort_by=[],
     style_table={'fontSize': '12px', 'backgroundColor': '#343a40', 'color': '#fff', 'border': '1px solid #495057',
                  'overflowX': 'auto', 'overflowY': 'auto'},
     style_cell={'backgroundColor': '#495057', 'color': '#fff'}
@@ -19,16 +51,36 @@ total_view_table = DataTable(
 
 monthly_view_table = DataTable(
     id='monthly-view-table',
-    columns=[{'name': col, 'id': col} for col in monthly_df.columns],
-    data=monthly_df.to_dict('records'),
+    columns=[{'name': col, 'id': col} for col in monthly_columns],
+    data=[],
+    page_action='custom',
+    page_current=0,
+    page_size=monthly_page_size,
+    sort_action='custom',
+    sort_mode='multi',
+    sort_by=[],
+    filter_action='custom',
+    filter_query='',
     style_table={'fontSize': '12px', 'backgroundColor': '#343a40', 'color': '#fff', 'border': '1px solid #495057', 'overflowX': 'auto', 'overflowY': 'auto'},
     style_cell={'backgroundColor': '#495057', 'color': '#fff'}
 )
 
-# Sample Graph components
-interest_bar_chart = dcc.Graph(
-    id='interest-bar-chart',
-    figure={
+
+def placeholder_figure(title):
+    return {
+        'data': [],
+        'layout': {
+            'title': title,
+            'xaxis': {'visible': False},
+            'yaxis': {'visible': False},
+            'annotations': [{'text': 'Loading statements...', 'showarrow': False, 'font': {'size': 16}}],
+            **chart_layout,
+        }
+    }
+
+
+def interest_figure(monthly_df):
+    return {
         'data': [
             go.Bar(x=monthly_df['Month'], y=monthly_df['Interest Paid'], name='Interest Paid', marker=dict(color='red')),
             go.Bar(x=monthly_df['Month'], y=monthly_df['Interest Saved'], name='Interest Saved', marker=dict(color='green'))
@@ -36,16 +88,13 @@ interest_bar_chart = dcc.Graph(
         'layout': {
             'title': 'Month to Month Interest',
             'barmode': 'group',
-            'plot_bgcolor': '#343a40',  # Dark background color for the plot area
-            'paper_bgcolor': '#495057',  # Dark background color for the entire graph
-            'font': {'color': '#fff'},  # White text color
+            **chart_layout,
         }
     }
-)
 
-loan_bar_chart = dcc.Graph(
-    id='loan-bar-chart',
-    figure={
+
+def loan_figure(monthly_df):
+    return {
         'data': [
             go.Bar(x=monthly_df['Month'], y=monthly_df['Additional Repayments'], name='Additional Repayments', marker=dict(color='green')),
             go.Bar(x=monthly_df['Month'], y=monthly_df['Principle Paid'], name='Principle Paid', marker=dict(color='red'))
@@ -53,25 +102,26 @@ loan_bar_chart = dcc.Graph(
         'layout': {
             'title': 'Month to Month Principle',
             'barmode': 'group',
-            'plot_bgcolor': '#343a40',
-            'paper_bgcolor': '#495057',
-            'font': {'color': '#fff'},
+            **chart_layout,
         }
     }
-)
 
-net_loan_savings = dcc.Graph(
-    id='net-loan-savings',
-    figure={
+
+def net_loan_savings_figure(monthly_df):
+    return {
         'data': [
             go.Bar(x=monthly_df['Month'], y=monthly_df['Loan Balance Change'], name='Loan Balance Change'),
         ],
         'layout': {
             'title': 'Month to Month Savings',
             'barmode': 'stack',
-            'plot_bgcolor': '#343a40',
-            'paper_bgcolor': '#495057',
-            'font': {'color': '#fff'},
+            **chart_layout,
         }
     }
-)
+
+
+interest_bar_chart = dcc.Graph(id='interest-bar-chart', figure=placeholder_figure('Month to Month Interest'))
+
+loan_bar_chart = dcc.Graph(id='loan-bar-chart', figure=placeholder_figure('Month to Month Principle'))
+
+net_loan_savings = dcc.Graph(id='net-loan-savings', figure=placeholder_figure('Month to Month Savings'))
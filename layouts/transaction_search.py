@@ -0,0 +1,43 @@
+import dash_bootstrap_components as dbc
+import dash_core_components as dcc
+import dash_html_components as html
+from dash_table import DataTable
+
+from etl.transaction_search import search_columns
+
+search_page_size = 20
+
+# The query is sent on every keystroke; results are searched and paged on the server
+search_controls = dbc.Row([
+    dbc.Col([
+        dbc.Label('Description', html_for='search-query'),
+        dbc.Input(id='search-query', placeholder='e.g. woolworths', value=''),
+    ], width=4),
+    dbc.Col([
+        dbc.Label('Dates', html_for='search-dates'),
+        html.Br(),
+        dcc.DatePickerRange(id='search-dates', display_format='YYYY-MM-DD', clearable=True),
+    ], width='auto'),
+    dbc.Col([
+        dbc.Label('Min amount ($)', html_for='search-min-amount'),
+        dbc.Input(id='search-min-amount', type='number', debounce=True),
+    ]),
+    dbc.Col([
+        dbc.Label('Max amount ($)', html_for='search-max-amount'),
+        dbc.Input(id='search-max-amount', type='number', debounce=True),
+    ]),
+], style={'margin-bottom': '10px'})
+
+search_status = html.Div(id='search-status')
+
+search_table = DataTable(
+    id='search-table',
+    columns=[{'name': col, 'id': col} for col in search_columns],
+    data=[],
+    page_action='custom',
+    page_current=0,
+    page_size=search_page_size,
+    style_table={'fontSize': '12px', 'backgroundColor': '#343a40', 'color': '#fff', 'border': '1px solid #495057',
+                 'overflowX': 'auto', 'overflowY': 'auto'},
+    style_cell={'backgroundColor': '#495057', 'color': '#fff', 'textAlign': 'left'}
+)
@@ -0,0 +1,145 @@
+import cProfile
+import functools
+import logging
+import os
+import threading
+import time
+
+import flask
+import pandas as pd
+from prometheus_client import CollectorRegistry, Counter, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+
+logger = logging.getLogger(__name__)
+
+latency_buckets = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60)
+payload_buckets = tuple(2 ** power for power in range(8, 26, 2))
+
+callback_seconds = Histogram('finance_tracker_callback_seconds',
+                             'Time spent in the callback function', ['callback'], buckets=latency_buckets)
+callback_request_seconds = Histogram('finance_tracker_callback_request_seconds',
+                                     'Time to answer a callback request, including serialising the response',
+                                     ['callback'], buckets=latency_buckets)
+callback_payload_bytes = Histogram('finance_tracker_callback_payload_bytes',
+                                   'Size of callback responses', ['callback'], buckets=payload_buckets)
+etl_stage_seconds = Histogram('finance_tracker_etl_stage_seconds',
+                              'Time spent in each ETL stage', ['stage'], buckets=latency_buckets)
+etl_rows = Counter('finance_tracker_etl_rows', 'Rows processed by each ETL stage', ['stage'])
+etl_bytes_read = Counter('finance_tracker_etl_bytes_read', 'Statement bytes read by each ETL stage', ['stage'])
+
+# Set FINANCE_TRACKER_PROFILE_SLOW_MS to keep a cProfile dump of every callback request slower than that
+profile_slow_ms = os.environ.get('FINANCE_TRACKER_PROFILE_SLOW_MS')
+profile_dir = 'data/profiles'
+profile_lock = threading.Lock()
+
+# Called with the name of each ETL stage as it finishes, to report the progress of a background refresh
+stage_listeners = []
+
+
+def output_rows(args, result):
+    # Rows in the DataFrames a stage returns
+    results = result if isinstance(result, tuple) else (result,)
+    return sum(len(value) for value in results if isinstance(value, pd.DataFrame))
+
+
+def input_rows(args, result):
+    return sum(len(value) for value in args if isinstance(value, pd.DataFrame))
+
+
+def etl_stage(stage, count_rows=output_rows):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with etl_stage_seconds.labels(stage).time():
+                result = func(*args, **kwargs)
+            if count_rows is not None:
+                etl_rows.labels(stage).inc(count_rows(args, result))
+            for listener in stage_listeners:
+                listener(stage)
+            return result
+        return wrapper
+    return decorator
+
+
+def record_bytes_read(stage, paths):
+    etl_bytes_read.labels(stage).inc(sum(os.path.getsize(path) for path in paths))
+
+
+def timed_callback(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with callback_seconds.labels(func.__name__).time():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def instrumented_callback(app):
+    # Use in place of app.callback so every callback function is timed
+    def callback(*args, **kwargs):
+        return lambda func: app.callback(*args, **kwargs)(timed_callback(func))
+    return callback
+
+
+def callback_name(app):
+    body = flask.request.get_json(silent=True) or {}
+    entry = app.callback_map.get(body.get('output'))
+    return entry['callback'].__name__ if entry else 'unknown'
+
+
+def start_callback_request():
+    if not flask.request.path.endswith('_dash-update-component'):
+        return
+    flask.g.callback_started = time.perf_counter()
+    if profile_slow_ms is not None and profile_lock.acquire(blocking=False):
+        flask.g.callback_profile = cProfile.Profile()
+        flask.g.callback_profile.enable()
+
+
+def finish_callback_request(app, response):
+    started = flask.g.pop('callback_started', None)
+    if started is None:
+        return response
+
+    profile = flask.g.pop('callback_profile', None)
+    if profile is not None:
+        profile.disable()
+        profile_lock.release()
+
+    elapsed = time.perf_counter() - started
+    name = callback_name(app)
+    callback_request_seconds.labels(name).observe(elapsed)
+    if not response.direct_passthrough:
+        callback_payload_bytes.labels(name).observe(len(response.get_data()))
+
+    if profile is not None and elapsed * 1000 >= float(profile_slow_ms):
+        os.makedirs(profile_dir, exist_ok=True)
+        path = os.path.join(profile_dir, f'{name}-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}.prof')
+        profile.dump_stats(path)
+        logger.warning('Callback %s took %.0f ms, profile written to %s', name, elapsed * 1000, path)
+    return response
+
+
+def release_callback_profile(exc=None):
+    # after_request is skipped when a callback raises, so the profiler and its lock are let go here as well
+    profile = flask.g.pop('callback_profile', None)
+    if profile is not None:
+        profile.disable()
+        profile_lock.release()
+
+
+def metrics_view():
+    # Under gunicorn with PROMETHEUS_MULTIPROC_DIR set, the samples of all workers are merged
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return flask.Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def instrument_server(app):
+    server = app.server
+    server.before_request(start_callback_request)
+    server.after_request(lambda response: finish_callback_request(app, response))
+    server.teardown_request(release_callback_profile)
+    server.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,144 @@
+import gzip
+import json
+import threading
+from collections import OrderedDict
+
+import flask
+from dash.dependencies import Output
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+compressible_types = {'application/json', 'text/html', 'text/javascript', 'application/javascript', 'text/css'}
+min_compress_bytes = 1024
+gzip_level = 6
+brotli_quality = 5
+
+# Serialised responses of figure callbacks keyed by (callback outputs, data version, input values), most recently
+# used last. Each entry keeps its body and the compressed bodies made for it so far.
+figure_cache = OrderedDict()
+figure_cache_size = 64
+figure_cache_lock = threading.Lock()
+
+# Callback outputs whose responses are cached, with a function returning the version of the data they are built
+# from. Outputs whose inputs already carry a data version use None.
+cached_outputs = {}
+
+# Dash's JavaScript bundles do not change while the server runs, so each is compressed once per encoding
+asset_cache = {}
+
+
+def callback_key(outputs):
+    # The key Dash gives a callback in its callback map and in the `output` field of update requests
+    ids = [f'{output.component_id}.{output.component_property}' for output in outputs]
+    return ids[0] if len(ids) == 1 else f'..{"...".join(ids)}..'
+
+
+def cached_figure_callback(callback):
+    # Use in place of `callback` for callbacks whose responses only depend on their inputs and `version()`
+    def register(*args, version=None, **kwargs):
+        dependencies = [arg for group in args for arg in (group if isinstance(group, list) else [group])]
+        cached_outputs[callback_key([arg for arg in dependencies if isinstance(arg, Output)])] = version
+        return callback(*args, **kwargs)
+    return register
+
+
+def accepted_encoding():
+    accepted = flask.request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def encode(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def set_encoded_body(response, body):
+    response.set_data(body)
+    response.headers['Content-Encoding'] = accepted_encoding()
+    response.vary.add('Accept-Encoding')
+
+
+def figure_key():
+    if flask.request.method != 'POST' or flask.request.path != '/_dash-update-component':
+        return None
+    body = flask.request.get_json(silent=True) or {}
+    output = body.get('output')
+    if output not in cached_outputs:
+        return None
+    version = cached_outputs[output]
+    inputs = json.dumps([item.get('value') for item in body.get('inputs', [])], sort_keys=True)
+    return output, version() if version else None, inputs
+
+
+def figure_response(entry):
+    # Callbacks are POSTs the browser never revalidates, so a cached figure is always sent whole
+    response = flask.Response(entry['body'], mimetype='application/json')
+    encoding = accepted_encoding()
+    if encoding is not None and len(entry['body']) >= min_compress_bytes:
+        if encoding not in entry['encoded']:
+            entry['encoded'][encoding] = encode(entry['body'], encoding)
+        set_encoded_body(response, entry['encoded'][encoding])
+    return response
+
+
+def cached_figure():
+    key = figure_key()
+    if key is None:
+        return None
+    with figure_cache_lock:
+        entry = figure_cache.get(key)
+        if entry is None:
+            flask.g.figure_key = key
+            return None
+        figure_cache.move_to_end(key)
+    return figure_response(entry)
+
+
+def store_figure(key, body):
+    entry = {'body': body, 'encoded': {}}
+    with figure_cache_lock:
+        figure_cache[key] = entry
+        while len(figure_cache) > figure_cache_size:
+            figure_cache.popitem(last=False)
+    return entry
+
+
+def compress_response(response):
+    if (response.direct_passthrough or response.status_code != 200 or 'Content-Encoding' in response.headers
+            or response.mimetype not in compressible_types):
+        return response
+    encoding = accepted_encoding()
+    body = response.get_data()
+    if encoding is None or len(body) < min_compress_bytes:
+        return response
+
+    if flask.request.path.startswith('/_dash-component-suites/'):
+        key = (flask.request.path, encoding)
+        if key not in asset_cache:
+            asset_cache[key] = encode(body, encoding)
+        set_encoded_body(response, asset_cache[key])
+    else:
+        set_encoded_body(response, encode(body, encoding))
+    return response
+
+
+def finish_response(response):
+    key = flask.g.pop('figure_key', None)
+    if key is not None and response.status_code == 200:
+        return figure_response(store_figure(key, response.get_data()))
+    return compress_response(response)
+
+
+def serve_cached_responses(app):
+    # Repeat requests for a cached figure are answered from the cache; everything large enough is compressed with
+    # brotli or gzip, whichever the client accepts
+    app.server.before_request(cached_figure)
+    app.server.after_request(finish_response)
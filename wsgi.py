@@ -0,0 +1,6 @@
+from app import create_app
+
+# Production entry point for multi-worker servers, e.g. `gunicorn wsgi:server --workers 4`.
+# The ETL runs once across all workers and its outputs are memory-mapped from data/store/shared.
+app = create_app(shared_dataset=True)
+server = app.server